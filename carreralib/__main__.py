@@ -5,14 +5,16 @@ import contextlib
 import curses
 import errno
 import logging
+import math
 import select
 import time
 
-from . import ControlUnit
-
-
-def posgetter(driver):
-    return (-driver.laps, driver.time)
+from . import ControlUnit, connection
+from .poll import PollScheduler
+from .race import RaceState
+from .record import Recorder, RecordingConnection
+from .screen import Screen, startlights
+from .writecache import WriteCache
 
 
 def formattime(time, longfmt=False):
@@ -43,52 +45,44 @@ class RMS(object):
     # FUEL_MASK = ControlUnit.Status.FUEL_MODE | ControlUnit.Status.REAL_MODE
     FUEL_MASK = ControlUnit.Status.PIT_LANE_MODE
 
-    class Driver(object):
-        def __init__(self, num):
-            self.num = num
-            self.time = None
-            self.laptime = None
-            self.bestlap = None
-            self.laps = 0
-            self.pits = 0
-            self.fuel = 0
-            self.pit = False
-
-        def newlap(self, timer):
-            if self.time is not None:
-                self.laptime = timer.timestamp - self.time
-                if self.bestlap is None or self.laptime < self.bestlap:
-                    self.bestlap = self.laptime
-                self.laps += 1
-            self.time = timer.timestamp
-
-    def __init__(self, cu, window):
+    def __init__(self, cu, window, fps=20):
         self.cu = cu
         self.window = window
         self.titleattr = curses.A_STANDOUT
-        self.lightattr = curses.color_pair(1)
+        self.scheduler = PollScheduler()
+        # screen is redrawn at most fps times per second, and only lines
+        # that changed since the last frame are updated
+        self.screen = Screen(window, fps, lightattr=curses.color_pair(1))
+        self.rows = []
+        self.race = RaceState()
+        # position tower updates are sent in the background, so they
+        # never delay polling
+        self.writes = WriteCache(cu)
+        self.writes.start()
         self.reset()
 
     def reset(self):
-        self.drivers = [self.Driver(num) for num in range(1, 9)]
-        self.maxlaps = 0
-        self.start = None
+        self.dirty = True
+        self.race.reset()
         # discard remaining timer messages
         status = self.cu.request()
         while not isinstance(status, ControlUnit.Status):
             status = self.cu.request()
         self.status = status
+        self.race.update(status)
         # reset cu timer
         self.cu.reset()
         # reset position tower
-        self.cu.clrpos()
+        self.writes.clrpos()
 
     def run(self):
-        self.window.nodelay(1)
         last = None
         while True:
             try:
                 self.update()
+                # wait for key presses until the next poll or frame is due
+                delay = min(self.scheduler.delay(), self.screen.delay())
+                self.window.timeout(max(int(math.ceil(delay * 1000)), 0))
                 c = self.window.getch()
                 if c == ord('q'):
                     break
@@ -106,7 +100,9 @@ class RMS(object):
                     self.cu.request(ControlUnit.FUEL_KEY)
                 elif c == ord('c'):
                     self.cu.request(ControlUnit.CODE_KEY)
-                data = self.cu.request()
+                if self.scheduler.delay() > 0:
+                    continue
+                data = self.scheduler.poll(self.cu)
                 # prevent counting duplicate laps
                 if data == last:
                     continue
@@ -117,62 +113,61 @@ class RMS(object):
                 else:
                     logging.warn('Unknown data from CU: ' + data)
                 last = data
-            except select.error as e:
+            except select.error:
                 pass
             except IOError as e:
                 if e.errno != errno.EINTR:
                     raise
 
     def handle_status(self, status):
-        for driver, fuel in zip(self.drivers, status.fuel):
-            driver.fuel = fuel
-        for driver, pit in zip(self.drivers, status.pit):
-            if pit and not driver.pit:
-                driver.pits += 1
-            driver.pit = pit
+        if status == self.status:
+            return
+        self.dirty = True
+        self.race.update(status)
         self.status = status
 
     def handle_timer(self, timer):
-        driver = self.drivers[timer.address]
-        driver.newlap(timer)
-        if self.maxlaps < driver.laps:
-            self.maxlaps = driver.laps
+        maxlaps = self.race.maxlaps
+        if self.race.update(timer):
+            self.dirty = True
+        if self.race.maxlaps > maxlaps:
             # position tower only handles 250 laps
-            self.cu.setlap(self.maxlaps % 250)
-        if self.start is None:
-            self.start = timer.timestamp
-
-    def update(self, blink=lambda: (time.time() * 2) % 2 == 0):
-        window = self.window
-        window.clear()
-        nlines, ncols = window.getmaxyx()
-        window.addnstr(0, 0, self.HEADER.ljust(ncols), ncols, self.titleattr)
-        window.addnstr(nlines - 2, 0, self.FOOTER1, ncols - 1)
-        window.addnstr(nlines - 1, 0, self.FOOTER2, ncols - 1)
-
-        start = self.status.start
-        if start == 0 or start == 7:
-            pass
-        elif start == 1:
-            window.chgat(nlines - 2, 0, 2 * 5, self.lightattr)
-        elif start < 7:
-            window.chgat(nlines - 2, 0, 2 * (start - 1), self.lightattr)
-        elif int(time.time() * 2) % 2 == 0:  # A_BLINK may not be supported
-            window.chgat(nlines - 2, 0, 2 * 5, self.lightattr)
-
-        drivers = [driver for driver in self.drivers if driver.time]
-        for pos, driver in enumerate(sorted(drivers, key=posgetter), start=1):
-            if pos == 1:
-                leader = driver
-                t = formattime(driver.time - self.start, True)
-            elif driver.laps == leader.laps:
-                t = '+%ss' % formattime(driver.time - leader.time)
+            self.writes.setlap(self.race.maxlaps % 250)
+
+    def update(self):
+        screen = self.screen
+        size = screen.begin()
+        if size is None:
+            return
+        nlines, ncols = size
+        if self.dirty:
+            self.rows = self.format()
+            self.dirty = False
+        lights = startlights(self.status.start, time.time())
+
+        screen.draw(0, self.HEADER.ljust(ncols), ncols, self.titleattr)
+        for row, text in enumerate(self.rows, start=1):
+            screen.draw(row, text, ncols)
+        screen.erase(len(self.rows) + 1, nlines - 2)
+        screen.draw(nlines - 2, self.FOOTER1, ncols - 1, lights=lights)
+        screen.draw(nlines - 1, self.FOOTER2, ncols - 1)
+        screen.end()
+
+    def format(self):
+        rows = []
+        race = self.race
+        for driver in race.standings:
+            laps, gap = race.gap(driver)
+            if driver.position == 1:
+                t = formattime(driver.time - race.start, True)
+            elif laps == 0:
+                t = '+%ss' % formattime(gap)
             else:
-                gap = leader.laps - driver.laps
-                t = '+%d Lap%s' % (gap, 's' if gap != 1 else '')
+                t = '+%d Lap%s' % (laps, 's' if laps != 1 else '')
             if (self.status.mode & self.FUEL_MASK) != 0:
                 text = self.FORMAT1.format(
-                    pos=pos, car=driver.num, time=t, laps=driver.laps,
+                    pos=driver.position, car=driver.num, time=t,
+                    laps=driver.laps,
                     laptime=formattime(driver.laptime),
                     bestlap=formattime(driver.bestlap),
                     fuel=driver.fuel/15.0,
@@ -180,34 +175,45 @@ class RMS(object):
                 )
             else:
                 text = self.FORMAT2.format(
-                    pos=pos, car=driver.num, time=t, laps=driver.laps,
+                    pos=driver.position, car=driver.num, time=t,
+                    laps=driver.laps,
                     laptime=formattime(driver.laptime),
                     bestlap=formattime(driver.bestlap)
                 )
-            window.addnstr(pos, 0, text, ncols)
-        window.refresh()
+            rows.append(text)
+        return rows
 
 
 parser = argparse.ArgumentParser(prog='python -m carreralib')
 parser.add_argument('device', metavar='DEVICE')
+parser.add_argument('-f', '--fps', default=20, type=float)
 parser.add_argument('-l', '--logfile', default='carreralib.log')
+parser.add_argument('-r', '--record', metavar='FILE')
 parser.add_argument('-t', '--timeout', default=1.0, type=float)
 parser.add_argument('-v', '--verbose', action='store_true')
 args = parser.parse_args()
 
 logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARN,
                     filename=args.logfile,
-                    format='%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s',
+                    format=('%(asctime)s.%(msecs)03d [%(levelname)s] ' +
+                            '%(message)s'),
                     datefmt='%Y-%m-%d,%H:%M:%S')
 
-with contextlib.closing(ControlUnit(args.device, timeout=args.timeout)) as cu:
+device = connection.open(args.device, timeout=args.timeout)
+if args.record:
+    device = RecordingConnection(device, Recorder(args.record))
+
+with contextlib.closing(ControlUnit(device)) as cu:
     print('CU version %s' % cu.version())
 
     def run(win):
         curses.curs_set(0)
         curses.init_pair(1, curses.COLOR_RED, curses.COLOR_BLACK)
-        rms = RMS(cu, win)
-        rms.run()
+        rms = RMS(cu, win, fps=args.fps)
+        try:
+            rms.run()
+        finally:
+            rms.writes.close(timeout=1.0)
     try:
         curses.wrapper(run)
     except KeyboardInterrupt:
@@ -0,0 +1,384 @@
+"""asyncio interface to Carrera(R) DIGITAL 124/132 slotcar systems.
+
+This module requires Python 3.7 or later.
+
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+
+from . import connection
+from . import protocol
+from .cu import ControlUnit, _VERSION_FORMAT, _setword_request
+from .cu import _DONE, _Link, _Pipeline, _RESEND, _clock
+from .stats import RequestStats
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConnection(object):
+    """Base class for asynchronous connections to a Carrera digital
+    slotcar system."""
+
+    async def close(self):
+        """Close the connection."""
+        pass
+
+    async def recv(self, maxlength=None):
+        """Return a complete message of byte data sent from the other
+        end of the connection as a bytes object.
+
+        """
+        raise NotImplementedError
+
+    async def send(self, buf, offset=0, size=None):
+        """Send byte data from an object supporting the buffer
+        interface as a complete message."""
+        raise NotImplementedError
+
+    async def sendmany(self, bufs):
+        """Send each object supporting the buffer interface in the
+        iterable `bufs` as a complete message."""
+        for buf in bufs:
+            await self.send(buf)
+
+
+class AsyncSerialConnection(AsyncConnection):
+    """Asynchronous serial connection using the event loop to wait for
+    input on the port's file descriptor.
+
+    `url` must name a port that provides a file descriptor, so this
+    does not work with pySerial's ``loop://`` URL, for example.  Input
+    is read using `loop`, or the running event loop of the first call
+    to :meth:`recv`.
+
+    """
+
+    def __init__(self, url, timeout=None, loop=None):
+        from serial import serial_for_url
+        self.__serial = serial_for_url(url, baudrate=19200, timeout=0)
+        self.__loop = loop
+        self.__reading = False
+        self.__timeout = timeout
+        self.__buffer = bytearray()
+        self.__output = bytearray()
+        self.__messages = collections.deque()
+        self.__error = None
+        self.__waiter = None
+
+    async def close(self):
+        if self.__reading:
+            self.__loop.remove_reader(self.__serial.fileno())
+        self.__serial.close()
+
+    async def recv(self, maxlength=None):
+        if not self.__reading:
+            if self.__loop is None:
+                self.__loop = asyncio.get_running_loop()
+            self.__loop.add_reader(self.__serial.fileno(), self.__read_ready)
+            self.__reading = True
+        if not self.__messages and self.__error is None:
+            self.__waiter = self.__loop.create_future()
+            try:
+                await asyncio.wait_for(self.__waiter, self.__timeout)
+            except asyncio.TimeoutError:
+                raise connection.TimeoutError(
+                    'Timeout waiting for serial data'
+                )
+            finally:
+                self.__waiter = None
+        if not self.__messages:
+            raise self.__error
+        buf = self.__messages.popleft()
+        if maxlength is not None and maxlength < len(buf):
+            raise connection.BufferTooShort(
+                'Buffer too short for data received'
+            )
+        return buf
+
+    async def send(self, buf, offset=0, size=None):
+        n = len(buf)
+        if offset < 0:
+            raise ValueError("offset is negative")
+        elif n < offset:
+            raise ValueError("buffer length < offset")
+        elif size is None:
+            size = n - offset
+        elif size < 0:
+            raise ValueError("size is negative")
+        elif offset + size > n:
+            raise ValueError("buffer length < offset + size")
+        await self.sendmany([memoryview(buf)[offset:offset+size]])
+
+    async def sendmany(self, bufs):
+        out = self.__output
+        del out[:]
+        for buf in bufs:
+            out.append(0x22)  # '"'
+            out.extend(buf)
+            out.append(0x24)  # '$'
+        self.__serial.write(out)
+
+    def __read_ready(self):
+        try:
+            data = self.__serial.read(self.__serial.in_waiting or 1)
+        except Exception as e:
+            self.__loop.remove_reader(self.__serial.fileno())
+            self.__error = e
+        else:
+            buf = self.__buffer
+            start = len(buf)
+            buf.extend(data)
+            begin = 0
+            end = buf.find(b'$', start)
+            while end >= 0:
+                self.__messages.append(bytes(buf[begin:end]))
+                begin = end + 1
+                end = buf.find(b'$', begin)
+            del buf[:begin]
+        waiter = self.__waiter
+        if waiter is None or waiter.done():
+            pass
+        elif self.__messages or self.__error is not None:
+            waiter.set_result(None)
+
+
+class ExecutorConnection(AsyncConnection):
+    """Adapter running a blocking :class:`carreralib.connection.Connection`
+    in a single worker thread."""
+
+    def __init__(self, conn, loop=None):
+        self.__connection = conn
+        self.__loop = loop
+        self.__executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    async def close(self):
+        try:
+            await self.__call(self.__connection.close)
+        finally:
+            self.__executor.shutdown(wait=False)
+
+    async def recv(self, maxlength=None):
+        return await self.__call(self.__connection.recv, maxlength)
+
+    async def send(self, buf, offset=0, size=None):
+        return await self.__call(self.__connection.send, buf, offset, size)
+
+    async def sendmany(self, bufs):
+        return await self.__call(self.__connection.sendmany, list(bufs))
+
+    def __call(self, func, *args):
+        loop = self.__loop or asyncio.get_running_loop()
+        return loop.run_in_executor(self.__executor, func, *args)
+
+
+class AsyncControlUnit(object):
+    """asyncio interface to a Carrera Digital 124/132 Control Unit.
+
+    This provides the same methods as :class:`carreralib.ControlUnit`
+    as coroutines, except for the background poller.  Concurrent
+    requests are serialized, so several tasks may share a single
+    :class:`AsyncControlUnit` instance.
+
+    """
+
+    Status = ControlUnit.Status
+
+    Timer = ControlUnit.Timer
+
+    PACE_CAR_KEY = ControlUnit.PACE_CAR_KEY
+
+    START_KEY = ControlUnit.START_KEY
+
+    SPEED_KEY = ControlUnit.SPEED_KEY
+
+    BRAKE_KEY = ControlUnit.BRAKE_KEY
+
+    FUEL_KEY = ControlUnit.FUEL_KEY
+
+    CODE_KEY = ControlUnit.CODE_KEY
+
+    def __init__(self, device, loop=None, hook=None, retries=5,
+                 deadline=None, backoff=0.005, **kwargs):
+        if isinstance(device, AsyncConnection):
+            self.__connection = device
+        elif isinstance(device, connection.Connection):
+            self.__connection = ExecutorConnection(device, loop=loop)
+        else:
+            logger.debug('Connecting to %s', device)
+            self.__connection = open(device, loop=loop, **kwargs)
+            logger.debug('Connection established')
+        self.__stats = RequestStats()
+        self.__link = _Link(self.__stats, retries, deadline, backoff, hook)
+        self.__lock = asyncio.Lock()
+
+    async def close(self):
+        """Close the connection to the CU."""
+        logger.debug('Closing connection')
+        await self.__connection.close()
+
+    async def clrpos(self):
+        """Clear/reset the Position Tower display."""
+        await self.setword(6, 0, 9)
+
+    async def ignore(self, mask):
+        """Ignore the controllers represented by bitmask `mask`."""
+        await self.request(protocol.pack('cBC', b':', mask))
+
+    async def request(self, buf=b'?', response_needed=True, maxlength=None):
+        """Send a message to the CU and wait for a response.
+
+        See :meth:`carreralib.ControlUnit.request`.
+
+        """
+        async with self.__lock:
+            link = self.__link
+            start = _clock()
+            timer = link.begin(buf, start)
+            if timer is not None:
+                return timer
+            logger.debug('Sending message %r', buf)
+            await self.__connection.send(buf)
+            link.sent()
+            while True:
+                try:
+                    res = await self.__connection.recv(maxlength)
+                except connection.TimeoutError:
+                    link.timeout(buf[0:1])
+                    raise
+                action = link.received(res, response_needed)
+                if action == _DONE:
+                    break
+                elif action == _RESEND:
+                    delay = link.retry()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    logger.info('Sending message %r again', buf)
+                    await self.__connection.send(buf)
+                    link.sent()
+                    link.stats.retransmits += 1
+            link.done(buf[0:1], start, link.retransmits)
+        if not response_needed:
+            return None
+        try:
+            return ControlUnit.decode(res)
+        except protocol.ChecksumError:
+            self.__stats.checksum_errors += 1
+            raise
+
+    async def pipeline(self, bufs, window=8):
+        """Send several messages to the CU without waiting for each
+        response, and return the list of responses.
+
+        See :meth:`carreralib.ControlUnit.pipeline`.
+
+        """
+        async with self.__lock:
+            pipeline = _Pipeline(self.__link, bufs, window)
+            while not pipeline.done():
+                batch = pipeline.batch()
+                if batch:
+                    await self.__connection.sendmany(batch)
+                if not pipeline.waiting:
+                    continue
+                try:
+                    res = await self.__connection.recv()
+                except connection.TimeoutError as e:
+                    pipeline.timeout(e)
+                else:
+                    pipeline.received(res)
+        results = []
+        for res in pipeline.results:
+            if isinstance(res, bytes):
+                try:
+                    res = ControlUnit.decode(res)
+                except protocol.ChecksumError as e:
+                    self.__stats.checksum_errors += 1
+                    res = e
+            results.append(res)
+        return results
+
+    async def reset(self):
+        """Reset the CU timer."""
+        await self.request(b'=10', response_needed=False)
+
+    async def setbrake(self, address, value):
+        """Set the brake value for controller `address`."""
+        await self.setword(1, address, value, repeat=2)
+
+    async def setfuel(self, address, value):
+        """Set the fuel value for controller `address`."""
+        await self.setword(2, address, value, repeat=2)
+
+    async def setlap(self, value):
+        """Set the current lap displayed by the Position Tower."""
+        if value < 0 or value > 255:
+            raise ValueError('Lap value out of range')
+        await self.setlap_hi(value >> 4)
+        await self.setlap_lo(value & 0xf)
+
+    async def setlap_hi(self, value):
+        """Set the high nibble of the current lap."""
+        await self.setword(17, 7, value)
+
+    async def setlap_lo(self, value):
+        """Set the low nibble of the current lap."""
+        await self.setword(18, 7, value)
+
+    async def setpos(self, address, position):
+        """Set the controller's position displayed by the Position
+        Tower."""
+        if position < 1 or position > 8:
+            raise ValueError('Position out of range')
+        await self.setword(6, address, position)
+
+    async def setspeed(self, address, value):
+        """Set the speed value for controller `address`."""
+        await self.setword(0, address, value, repeat=2)
+
+    async def setword(self, word, address, value, repeat=1,
+                      response_needed=True):
+        buf = _setword_request(word, address, value, repeat)
+        return await self.request(buf, response_needed=response_needed)
+
+    async def setwords(self, commands, window=8):
+        """Send several :meth:`setword` commands using :meth:`pipeline`.
+
+        See :meth:`carreralib.ControlUnit.setwords`.
+
+        """
+        bufs = []
+        for command in commands:
+            if len(command) == 3:
+                command = tuple(command) + (1,)
+            bufs.append(_setword_request(*command))
+        return await self.pipeline(bufs, window)
+
+    def stats(self, reset=False):
+        """Return request statistics as a dictionary.
+
+        See :meth:`carreralib.ControlUnit.stats`.
+
+        """
+        snapshot = self.__stats.snapshot()
+        if reset:
+            self.__stats = self.__link.stats = RequestStats()
+        return snapshot
+
+    async def start(self):
+        """Initiate the CU start sequence."""
+        await self.request(self.START_KEY, response_needed=False)
+
+    async def version(self):
+        """Retrieve the CU version."""
+        return _VERSION_FORMAT.unpack(await self.request(b'0'))[0]
+
+
+def open(device, loop=None, **kwargs):
+    """Open an asynchronous connection to the given device."""
+    if device.startswith(('replay:', 'sim:')) or len(device.split(':')) == 6:
+        return ExecutorConnection(connection.open(device, **kwargs), loop)
+    else:
+        return AsyncSerialConnection(device, loop=loop, **kwargs)
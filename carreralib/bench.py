@@ -0,0 +1,222 @@
+"""Benchmarks for the protocol and poll loop.
+
+Run ``python -m carreralib.bench`` to measure protocol and decoding
+throughput using the frames recorded in ``logs/*.log``.  Results can
+be written as JSON with ``--output`` and compared against a previously
+saved result with ``--baseline``; the exit status is non-zero if any
+benchmark got slower than the given threshold.  With ``--allocations``,
+the peak memory allocated per call is measured and compared as well.
+
+Other packages may provide additional benchmarks in a module with a
+:func:`benchmarks` function like the one in this module, which is
+loaded with ``--module``.
+
+"""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import glob
+import importlib
+import io
+import itertools
+import json
+import platform
+import sys
+import timeit
+
+from . import connection
+from . import protocol
+from .cu import ControlUnit
+from .replay import exchanges
+
+
+class FrameConnection(connection.Connection):
+    """Connection answering each request with the next of the given
+    response frames, starting over when all have been sent."""
+
+    def __init__(self, frames):
+        self.__frames = frames
+        self.__index = 0
+
+    def recv(self, maxlength=None):
+        frame = self.__frames[self.__index]
+        self.__index = (self.__index + 1) % len(self.__frames)
+        return frame
+
+    def send(self, buf, offset=0, size=None):
+        pass
+
+
+def load_frames(paths):
+    """Return the status, timer and other response frames recorded in
+    the log files `paths`."""
+    status, timer, other = [], [], []
+    for path in paths:
+        with io.open(path, encoding='utf-8') as f:
+            for exchange in exchanges(f):
+                for _, frame in exchange.responses:
+                    if frame.startswith(b'?:'):
+                        status.append(frame)
+                    elif frame.startswith(b'?'):
+                        timer.append(frame)
+                    else:
+                        other.append(frame)
+    return status, timer, other
+
+
+def benchmarks(status, timer):
+    """Generate `(name, func, items)` tuples for the frames given,
+    where `func` is to be called once for each of `items`."""
+    frames = status + timer
+    requests = [(b'J', word | address << 5, value, 1)
+                for word in (0, 1, 2, 6)
+                for address in range(8)
+                for value in range(16)]
+    yield 'protocol.pack', lambda args: protocol.pack('cBYYC', *args), requests
+    yield ('protocol.unpack', lambda buf: protocol.unpack('2x8YYYBYC', buf),
+           [buf for buf in status if len(buf) == 16])
+    yield ('protocol.chksum',
+           lambda buf: protocol.chksum(buf, 1, len(buf) - 2), frames)
+    yield 'ControlUnit.decode', ControlUnit.decode, frames
+
+    cu = ControlUnit(FrameConnection(frames))
+    yield 'ControlUnit.request', lambda _: cu.request(), frames
+
+
+def autorange(timer, mintime=0.2):
+    """Return the number of loops so that the total time of `timer` is
+    at least `mintime` seconds, like :meth:`timeit.Timer.autorange`,
+    which requires Python 3.6."""
+    number = 1
+    while True:
+        for n in (1, 2, 5):
+            if timer.timeit(number * n) >= mintime:
+                return number * n
+        number *= 10
+
+
+def run(name, func, items, repeat=5):
+    """Time calling `func` for each of `items` and return the result
+    as a dictionary."""
+    def loop():
+        for item in items:
+            func(item)
+    timer = timeit.Timer(loop)
+    number = autorange(timer)
+    best = min(timer.repeat(repeat, number)) / number
+    return {
+        'name': name,
+        'items': len(items),
+        'ns_per_op': best / len(items) * 1e9,
+        'ops_per_sec': len(items) / best
+    }
+
+
+def allocations(func, items):
+    """Return the mean peak memory in bytes allocated while calling
+    `func` for one of `items`, including its result, or `None` if
+    :mod:`tracemalloc` is not available."""
+    try:
+        import tracemalloc
+    except ImportError:
+        return None  # Python 2
+    tracemalloc.start()
+    try:
+        total = 0
+        for item in items:
+            tracemalloc.clear_traces()  # also resets the peak
+            func(item)
+            total += tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return total / len(items)
+
+
+def compare(results, baseline, threshold, key='ns_per_op'):
+    """Compare `results` with `baseline` and generate `(name, ratio)`
+    tuples for benchmarks whose `key` value increased by more than
+    `threshold`."""
+    previous = {r['name']: r.get(key) for r in baseline['results']}
+    for result in results['results']:
+        if result.get(key) is not None and previous.get(result['name']):
+            ratio = result[key] / previous[result['name']]
+            if ratio > 1 + threshold:
+                yield result['name'], ratio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m carreralib.bench')
+    parser.add_argument('logs', metavar='LOG', nargs='*',
+                        help='log files to read frames from')
+    parser.add_argument('-a', '--allocations', action='store_true',
+                        help='measure memory allocated per call')
+    parser.add_argument('-b', '--baseline', metavar='FILE',
+                        help='compare results with a saved baseline')
+    parser.add_argument('-k', '--filter', metavar='NAME', default='',
+                        help='only run benchmarks containing NAME')
+    parser.add_argument('-m', '--module', metavar='MODULE', action='append',
+                        default=[], help='also run benchmarks from MODULE')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='write JSON results to FILE')
+    parser.add_argument('-r', '--repeat', default=5, type=int)
+    parser.add_argument('-t', '--threshold', default=0.1, type=float,
+                        help='relative slowdown considered a regression')
+    args = parser.parse_args(argv)
+
+    paths = args.logs or sorted(glob.glob('logs/*.log'))
+    if not paths:
+        parser.error('no log files found')
+    status, timer, _ = load_frames(paths)
+    if not status or not timer:
+        parser.error('logs contain no status or timer frames')
+
+    results = {
+        'python': platform.python_implementation(),
+        'python_version': platform.python_version(),
+        'machine': platform.machine(),
+        'frames': {'status': len(status), 'timer': len(timer)},
+        'results': []
+    }
+    generators = [benchmarks(status, timer)]
+    for module in args.module:
+        module = importlib.import_module(module)
+        generators.append(module.benchmarks(status, timer))
+    for name, func, items in itertools.chain(*generators):
+        if args.filter in name:
+            result = run(name, func, items, args.repeat)
+            results['results'].append(result)
+            line = '%-28s %10.0f ns/op %12.0f ops/s' % (
+                name, result['ns_per_op'], result['ops_per_sec']
+            )
+            if args.allocations:
+                result['bytes_per_op'] = allocations(func, items)
+                if result['bytes_per_op'] is not None:
+                    line += ' %8.0f B/op' % result['bytes_per_op']
+            print(line)
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True))
+            f.write('\n')
+    if args.baseline:
+        with io.open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = list(compare(results, baseline, args.threshold))
+        for name, ratio in regressions:
+            print('%s is %.0f%% slower than baseline' % (
+                name, (ratio - 1) * 100
+            ))
+        if args.allocations:
+            allocs = list(compare(results, baseline, args.threshold,
+                                  'bytes_per_op'))
+            for name, ratio in allocs:
+                print('%s allocates %.0f%% more than baseline' % (
+                    name, (ratio - 1) * 100
+                ))
+            regressions += allocs
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,10 +39,26 @@ class Connection(object):
         interface as a complete message."""
         raise NotImplementedError
 
+    def sendmany(self, bufs):
+        """Send each object supporting the buffer interface in the
+        iterable `bufs` as a complete message.
+
+        Subclasses may override this to send all messages at once.
+
+        """
+        for buf in bufs:
+            self.send(buf)
+
 
 def open(device, **kwargs):
     """Open a connection to the given device."""
-    if len(device.split(':')) == 6:
+    if device.startswith('replay:'):
+        from .replay import ReplayConnection
+        return ReplayConnection(device[len('replay:'):], **kwargs)
+    elif device.startswith('sim:'):
+        from .sim import SimulatedConnection
+        return SimulatedConnection(device[len('sim:'):], **kwargs)
+    elif len(device.split(':')) == 6:
         from .bluepy import BluepyConnection
         return BluepyConnection(device, **kwargs)
     else:
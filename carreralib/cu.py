@@ -1,13 +1,51 @@
 from __future__ import absolute_import, division, unicode_literals
 
+import collections
+import heapq
 import logging
+import threading
+import time
 from collections import namedtuple
 
 from . import connection
 from . import protocol
+from .stats import RequestStats
 
 logger = logging.getLogger(__name__)
 
+_clock = getattr(time, 'perf_counter', time.time)
+
+# pit lane bit mask to tuple of booleans, and vice versa
+_PIT_TUPLES = tuple(
+    tuple(mask & (1 << n) != 0 for n in range(8)) for mask in range(256)
+)
+_PIT_MASKS = {pit: mask for mask, pit in enumerate(_PIT_TUPLES)}
+
+# recent CU versions report two extra unknown bytes with '?:'
+_STATUS_FORMATS = {
+    struct.size: struct for struct in (
+        protocol.Struct('2x8YYYBYC'),
+        protocol.Struct('2x8YYYBYxxC')
+    )
+}
+_STATUS_ENCODE_FORMAT = protocol.Struct('cc8YYYBYC')
+_TIMER_FORMAT = protocol.Struct('xYIYC')
+_TIMER_ENCODE_FORMAT = protocol.Struct('cYIYC')
+_VERSION_FORMAT = protocol.Struct('x4sC')
+_SETWORD_FORMAT = protocol.Struct('cBYYC')
+
+# valid lengths of timer and status responses to '?' requests
+_POLL_LENGTHS = frozenset([_TIMER_FORMAT.size]) | frozenset(_STATUS_FORMATS)
+
+# valid response lengths of commands with known response formats
+_RESPONSE_LENGTHS = {
+    b'?': _POLL_LENGTHS,
+    b'0': frozenset([_VERSION_FORMAT.size])
+}
+
+# actions returned by _Link.received()
+_DONE, _WAIT, _RESEND = range(3)
+
 
 class ControlUnit(object):
     """Interface to a Carrera Digital 124/132 Control Unit."""
@@ -48,6 +86,34 @@ class ControlUnit(object):
         LAP_COUNTER_MODE = 0x8
         """Mode bit mask indicating a lap counter is connected."""
 
+        @property
+        def pitmask(self):
+            """The 8-bit pit lane bit mask :attr:`pit` was created from."""
+            try:
+                return _PIT_MASKS[self.pit]
+            except (KeyError, TypeError):
+                return sum(1 << n for n, pit in enumerate(self.pit) if pit)
+
+        @classmethod
+        def decode(cls, buf):
+            """Create a :class:`ControlUnit.Status` object from a
+            ``?:`` response message."""
+            try:
+                struct = _STATUS_FORMATS[len(buf)]
+            except KeyError:
+                raise protocol.ProtocolError('Invalid status message length')
+            parts = struct.unpack(buf)
+            fuel, (start, mode, pitmask, display) = parts[:8], parts[8:]
+            return cls(fuel, start, mode, _PIT_TUPLES[pitmask], display)
+
+        def encode(self):
+            """Return the ``?:`` response message for this status."""
+            return _STATUS_ENCODE_FORMAT.pack(
+                b'?', b':', *(tuple(self.fuel) + (
+                    self.start, self.mode, self.pitmask, self.display
+                ))
+            )
+
     class Timer(namedtuple('Timer', 'address timestamp sector')):
         """Response type for timer events.
 
@@ -66,7 +132,21 @@ class ControlUnit(object):
         +-------------------+-------+-----------------------------------------+
 
         """
-        pass
+
+        __slots__ = ()
+
+        @classmethod
+        def decode(cls, buf):
+            """Create a :class:`ControlUnit.Timer` object from a ``?``
+            response message."""
+            address, timestamp, sector = _TIMER_FORMAT.unpack(buf)
+            return cls(address - 1, timestamp, sector)
+
+        def encode(self):
+            """Return the ``?`` response message for this timer event."""
+            return _TIMER_ENCODE_FORMAT.pack(
+                b'?', self.address + 1, self.timestamp, self.sector
+            )
 
     PACE_CAR_KEY = b'T1'
     """Request for emulating the Control Unit's PACE CAR/ESC key."""
@@ -86,7 +166,12 @@ class ControlUnit(object):
     CODE_KEY = b'T8'
     """Request for emulating the Control Unit's CODE key."""
 
-    def __init__(self, device, **kwargs):
+    def __init__(self, device, hook=None, retries=5, deadline=None,
+                 backoff=0.005, **kwargs):
+        self.__stats = RequestStats()
+        self.__link = _Link(self.__stats, retries, deadline, backoff, hook)
+        self.__lock = threading.RLock()
+        self.__poller = None
         if isinstance(device, connection.Connection):
             self.__connection = device
         else:
@@ -96,6 +181,8 @@ class ControlUnit(object):
 
     def close(self):
         """Close the connection to the CU."""
+        if self.__poller is not None:
+            self.__poller.stop(timeout=1.0)
         logger.debug('Closing connection')
         self.__connection.close()
 
@@ -114,49 +201,170 @@ class ControlUnit(object):
         :class:`ControlUnit.Timer` or :class:`ControlUnit.Status`,
         depending on whether any timer events are pending.
 
+        If a response does not match the request, the request is sent
+        again, at most `retries` times with exponential backoff, and
+        not after the request's `deadline` has passed; then
+        :exc:`carreralib.connection.TimeoutError` is raised.  Timer
+        events received in place of other responses are kept and
+        returned by the next ``?`` request.
+
+        This method is thread-safe, so commands may be sent while a
+        background :meth:`poller` is running.
+
         """
+        with self.__lock:
+            return self.__request(buf, response_needed, maxlength)
+
+    def __request(self, buf, response_needed, maxlength):
+        link = self.__link
+        start = _clock()
+        timer = link.begin(buf, start)
+        if timer is not None:
+            return timer
+        stats = self.__stats
         logger.debug('Sending message %r', buf)
         self.__connection.send(buf)
+        link.sent()
         while True:
-            res = self.__connection.recv(maxlength)
-            if res.startswith(buf[0:1]):
+            try:
+                res = self.__connection.recv(maxlength)
+            except connection.TimeoutError:
+                link.timeout(buf[0:1])
+                raise
+            action = link.received(res, response_needed)
+            if action == _DONE:
                 break
-            else:
-                logger.warn('Received unexpected message %r', res)
-                if response_needed:
-                    # TODO cerhard 4/19/2020 - sometimes the response we get from the CU is wrong,
-                    # causing this error.  Seems to be more prevelant on my Raspberry Pi 4 with FTDI UART.
-                    # Adjusting baud rate, updating drivers, etc. did not work.
-                    #
-                    # If we care about the resonse, we're gonna have to send this message again and retry.
-                    # If we don't care about a response, we're done here.
-                    logger.info('Sending message %r again', buf)
-                    self.__connection.send(buf)
-                else:
-                    return None
-        
+            elif action == _RESEND:
+                delay = link.retry()
+                if delay > 0:
+                    time.sleep(delay)
+                logger.info('Sending message %r again', buf)
+                self.__connection.send(buf)
+                link.sent()
+                stats.retransmits += 1
+        link.done(buf[0:1], start, link.retransmits)
+
         if not response_needed:
             return None
- 
-        if res.startswith(b'?:'):
-            # recent CU versions report two extra unknown bytes with '?:'
-            try:
-                parts = protocol.unpack('2x8YYYBYC', res)
-            except protocol.ChecksumError:
-                parts = protocol.unpack('2x8YYYBYxxC', res)
-            fuel, (start, mode, pitmask, display) = parts[:8], parts[8:]
-            pit = tuple(pitmask & (1 << n) != 0 for n in range(8))
-            status = ControlUnit.Status(fuel, start, mode, pit, display)
-            logger.debug("Status from track: {}".format(status))
+        try:
+            return self.decode(res)
+        except protocol.ChecksumError:
+            stats.checksum_errors += 1
+            raise
+
+    def stats(self, reset=False):
+        """Return request statistics as a dictionary.
+
+        This contains the number of messages sent, retransmitted
+        requests, unexpected responses, checksum errors, timeouts and
+        buffered timer events since the CU was opened or the
+        statistics were last reset, as well as a latency histogram for
+        each command sent.
+
+        """
+        snapshot = self.__stats.snapshot()
+        if reset:
+            self.__stats = self.__link.stats = RequestStats()
+        return snapshot
+
+    def subscribe(self, callback, **kwargs):
+        """Call `callback` from the background :meth:`poller` with each
+        :class:`Status` and :class:`Timer` event received.
+
+        Additional keyword arguments are passed to :meth:`poller` if
+        it has not been started yet.
+
+        """
+        self.poller(**kwargs).subscribe(callback)
+
+    @staticmethod
+    def decode(buf):
+        """Decode a response message received from the CU.
+
+        Returns an instance of :class:`ControlUnit.Status` or
+        :class:`ControlUnit.Timer` for ``?`` responses, or `buf`
+        unchanged for any other response.
+
+        """
+        if buf.startswith(b'?:'):
+            status = ControlUnit.Status.decode(buf)
+            logger.debug('Status from track: %s', status)
             return status
-        elif res.startswith(b'?'):
-            address, timestamp, sector = protocol.unpack('xYIYC', res)
-            timer = ControlUnit.Timer(address - 1, timestamp, sector)
-            logger.debug("Timer from track: {}".format(timer))
+        elif buf.startswith(b'?'):
+            timer = ControlUnit.Timer.decode(buf)
+            logger.debug('Timer from track: %s', timer)
             return timer
 
-        logger.debug("Unknown from track: {}".format(res))
-        return res
+        # command echo or version response, passed on as is
+        logger.debug('Unknown from track: %s', buf)
+        return buf
+
+    def events(self, maxsize=100, **kwargs):
+        """Return an iterable subscription to the :class:`Status` and
+        :class:`Timer` events received by the background
+        :meth:`poller`.
+
+        At most `maxsize` undelivered events are buffered; if the
+        subscriber falls behind, the oldest events are dropped.
+        Additional keyword arguments are passed to :meth:`poller` if
+        it has not been started yet.
+
+        """
+        return self.poller(**kwargs).events(maxsize)
+
+    def pipeline(self, bufs, window=8):
+        """Send several messages to the CU without waiting for each
+        response, and return the list of responses.
+
+        At most `window` messages are awaiting a response at any time.
+        Responses are matched to messages in the order they were sent,
+        and messages that are not answered correctly are sent again in
+        their original order, before any messages not sent yet, subject
+        to the CU's `retries` and `deadline`.  As with :meth:`request`,
+        the latency of each message is recorded and passed to the CU's
+        `hook`.  For messages that could not be sent successfully, the
+        list holds the exception that occurred instead of the response.
+
+        """
+        with self.__lock:
+            pipeline = _Pipeline(self.__link, bufs, window)
+            while not pipeline.done():
+                batch = pipeline.batch()
+                if batch:
+                    self.__connection.sendmany(batch)
+                if not pipeline.waiting:
+                    continue
+                try:
+                    res = self.__connection.recv()
+                except connection.TimeoutError as e:
+                    pipeline.timeout(e)
+                else:
+                    pipeline.received(res)
+        results = []
+        for res in pipeline.results:
+            if isinstance(res, bytes):
+                try:
+                    res = self.decode(res)
+                except protocol.ChecksumError as e:
+                    self.__stats.checksum_errors += 1
+                    res = e
+            results.append(res)
+        return results
+
+    def poller(self, **kwargs):
+        """Return the background poller of this CU, starting it if
+        necessary.
+
+        Keyword arguments are passed to
+        :class:`carreralib.poller.Poller` when the poller is started.
+
+        """
+        with self.__lock:
+            if self.__poller is None or not self.__poller.is_alive():
+                from .poller import Poller
+                self.__poller = Poller(self, **kwargs)
+                self.__poller.start()
+            return self.__poller
 
     def reset(self):
         """Reset the CU timer."""
@@ -201,21 +409,272 @@ class ControlUnit(object):
         self.setword(0, address, value, repeat=2)
 
     def setword(self, word, address, value, repeat=1, response_needed=True):
-        if word < 0 or word > 31:
-            raise ValueError('Command word out of range')
-        if address < 0 or address > 7:
-            raise ValueError('Address out of range')
-        if value < 0 or value > 15:
-            raise ValueError('Value out of range')
-        if repeat < 1 or repeat > 15:
-            raise ValueError('Repeat count out of range')
-        buf = protocol.pack('cBYYC', b'J', word | address << 5, value, repeat)
+        buf = _setword_request(word, address, value, repeat)
         return self.request(buf, response_needed=response_needed)
 
+    def setwords(self, commands, window=8):
+        """Send several :meth:`setword` commands using :meth:`pipeline`.
+
+        `commands` is an iterable of `(word, address, value)` or
+        `(word, address, value, repeat)` tuples.  Returns the list of
+        responses, with exceptions for commands that failed.
+
+        """
+        bufs = []
+        for command in commands:
+            if len(command) == 3:
+                command = tuple(command) + (1,)
+            bufs.append(_setword_request(*command))
+        return self.pipeline(bufs, window)
+
     def start(self):
         """Initiate the CU start sequence."""
         self.request(self.START_KEY, response_needed=False)
 
     def version(self):
         """Retrieve the CU version."""
-        return protocol.unpack('x4sC', self.request(b'0'))[0]
+        return _VERSION_FORMAT.unpack(self.request(b'0'))[0]
+
+
+def _setword_request(word, address, value, repeat):
+    if word < 0 or word > 31:
+        raise ValueError('Command word out of range')
+    if address < 0 or address > 7:
+        raise ValueError('Address out of range')
+    if value < 0 or value > 15:
+        raise ValueError('Value out of range')
+    if repeat < 1 or repeat > 15:
+        raise ValueError('Repeat count out of range')
+    return _SETWORD_FORMAT.pack(b'J', word | address << 5, value, repeat)
+
+
+def _matches(buf, res):
+    command = buf[0:1]
+    if not res.startswith(command):
+        return False
+    lengths = _RESPONSE_LENGTHS.get(command)
+    return lengths is None or len(res) in lengths
+
+
+class _Link(object):
+    """Response matching and retry state shared by all requests.
+
+    Each message sent is answered by exactly one response, so counting
+    the responses still expected tells stale responses, e.g. to a
+    request that was sent again, from lost ones: only if no more
+    responses are expected does a request need to be sent again.
+    Responses still expected when a request timed out may arrive late,
+    so as many responses starting with that request's command are
+    discarded before accepting a response to the next request.  This
+    keeps requests and responses in sync after garbage was received,
+    without flooding the CU with retransmits.
+
+    """
+
+    def __init__(self, stats, retries, deadline, backoff, hook=None,
+                 maxtimers=64):
+        self.stats = stats
+        self.hook = hook
+        self.retries = retries
+        self.maxtime = deadline
+        self.backoff = backoff
+        self.inflight = 0
+        self.timers = collections.deque(maxlen=maxtimers)
+        self.buf = None
+        self.late = 0
+        self.previous = None
+        self.discarded = 0
+        self.deadline = None
+        self.retransmits = 0
+
+    def begin(self, buf, start):
+        """Start a new request, and return a buffered timer event if
+        `buf` is a ``?`` request and timer events are pending."""
+        if self.timers and buf[0:1] == b'?':
+            timer = self.timers.popleft()
+            logger.debug('Buffered timer from track: %s', timer)
+            self.done(b'?', start, 0)
+            return timer
+        self.buf = buf
+        self.discarded = 0
+        self.retransmits = 0
+        if self.maxtime is None:
+            self.deadline = None
+        else:
+            self.deadline = start + self.maxtime
+        return None
+
+    def done(self, command, start, retransmits):
+        """Record the latency of a request for `command` that was
+        first sent at `start`."""
+        latency = _clock() - start
+        self.stats.add_latency(command, latency)
+        if self.hook is not None:
+            self.hook(command, latency, retransmits)
+
+    def sent(self):
+        self.stats.sends += 1
+        self.inflight += 1
+
+    def timeout(self, command):
+        """Record a timeout of a request for `command`."""
+        # responses still expected are lost, or will arrive late; any
+        # earlier late responses did not arrive in time, so were lost,
+        # or were actually the ones discarded since the last timeout
+        self.stats.timeouts += 1
+        self.late = max(self.inflight - self.discarded, 0)
+        self.previous = command
+        self.inflight = 0
+        self.discarded = 0
+
+    def stale(self, buf, res):
+        """Return whether `res` is a late response to a request that
+        timed out, rather than a response to `buf`."""
+        if not self.late:
+            return False
+        elif res.startswith(self.previous):
+            self.late -= 1
+            self.discarded += 1
+            self.unexpected(res)
+            return True
+        elif _matches(buf, res):
+            self.late = 0  # responses arrive in order, so these were lost
+        return False
+
+    def received(self, res, response_needed):
+        """Return the action to take after receiving `res`."""
+        if self.stale(self.buf, res):
+            return _WAIT
+        self.inflight = max(self.inflight - 1, 0)
+        if _matches(self.buf, res):
+            return _DONE
+        self.unexpected(res)
+        if self.inflight:
+            return _WAIT  # response to this request still expected
+        elif response_needed:
+            return _RESEND
+        else:
+            return _DONE
+
+    def unexpected(self, res):
+        """Count an unexpected response, and keep it if it is a timer
+        event."""
+        stats = self.stats
+        stats.unexpected += 1
+        logger.warning('Received unexpected message %r', res)
+        if len(res) == _TIMER_FORMAT.size and res.startswith(b'?'):
+            try:
+                self.timers.append(ControlUnit.Timer.decode(res))
+                stats.buffered += 1
+            except protocol.ChecksumError:
+                stats.checksum_errors += 1
+
+    def retry(self):
+        """Return the delay before sending the request again, or raise
+        :exc:`carreralib.connection.TimeoutError` if no more retries
+        are left."""
+        retransmits = self.retransmits
+        if retransmits >= self.retries:
+            raise connection.TimeoutError(
+                'No response to %r after %d retransmits' % (
+                    self.buf, retransmits
+                )
+            )
+        # first retransmit is immediate, since garbage is usually a
+        # single corrupted frame
+        delay = self.backoff * ((1 << retransmits) >> 1)
+        if self.deadline is not None and _clock() + delay > self.deadline:
+            raise connection.TimeoutError(
+                'No response to %r within deadline' % (self.buf,)
+            )
+        self.retransmits += 1
+        return delay
+
+
+class _Pipeline(object):
+    """Send and response matching state of pipelined requests.
+
+    Requests are sent in batches, with at most `window` requests
+    awaiting a response.  Since responses arrive in the order requests
+    were sent, each response is matched against the oldest request
+    still waiting; requests that are not answered correctly are sent
+    again with the next batch.  The queue of requests to send is a
+    heap of request indices, so requests sent again are sent in their
+    original order, and before any requests not sent yet.
+
+    """
+
+    def __init__(self, link, bufs, window):
+        if window < 1:
+            raise ValueError('Window size must be positive')
+        self.link = link
+        link.discarded = 0
+        self.bufs = [bytes(buf) for buf in bufs]
+        self.window = window
+        self.results = [None] * len(self.bufs)
+        self.attempts = [0] * len(self.bufs)
+        self.starts = [None] * len(self.bufs)
+        self.queue = list(range(len(self.bufs)))
+        self.waiting = collections.deque()
+        if link.maxtime is None:
+            self.deadline = None
+        else:
+            self.deadline = _clock() + link.maxtime
+
+    def done(self):
+        return not self.queue and not self.waiting
+
+    def batch(self):
+        """Return the next batch of requests to send."""
+        if self.deadline is not None and _clock() > self.deadline:
+            for n in self.queue:
+                self.results[n] = connection.TimeoutError(
+                    'No response to %r within deadline' % (self.bufs[n],)
+                )
+            del self.queue[:]
+        bufs = []
+        while self.queue and len(self.waiting) < self.window:
+            n = heapq.heappop(self.queue)
+            if self.attempts[n]:
+                logger.info('Sending message %r again', self.bufs[n])
+                self.link.stats.retransmits += 1
+            else:
+                logger.debug('Sending message %r', self.bufs[n])
+                self.starts[n] = _clock()
+            self.attempts[n] += 1
+            self.waiting.append(n)
+            self.link.sent()
+            bufs.append(self.bufs[n])
+        return bufs
+
+    def received(self, res):
+        link = self.link
+        n = self.waiting[0]
+        if link.stale(self.bufs[n], res):
+            return
+        link.inflight = max(link.inflight - 1, 0)
+        if _matches(self.bufs[n], res):
+            self.waiting.popleft()
+            self.results[n] = res
+            link.done(self.bufs[n][0:1], self.starts[n], self.attempts[n] - 1)
+            return
+        link.unexpected(res)
+        if link.inflight >= len(self.waiting):
+            return  # stale response, all requests still expect theirs
+        self.waiting.popleft()
+        self.failed(n, connection.TimeoutError(
+            'No response to %r after %d retransmits' % (
+                self.bufs[n], self.attempts[n] - 1
+            )
+        ))
+
+    def timeout(self, error):
+        self.link.timeout(self.bufs[self.waiting[0]][0:1])
+        while self.waiting:
+            self.failed(self.waiting.popleft(), error)
+
+    def failed(self, n, error):
+        if self.attempts[n] <= self.link.retries:
+            heapq.heappush(self.queue, n)
+        else:
+            self.results[n] = error
@@ -0,0 +1,137 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import array
+import itertools
+import math
+import operator
+
+try:
+    from itertools import accumulate as _accumulate
+except ImportError:  # Python 2
+    def _accumulate(iterable):
+        total = 0
+        for value in iterable:
+            total += value
+            yield total
+
+# unsigned 32-bit lap times in milliseconds
+_TIME_TYPECODE = str('I') if array.array(str('I')).itemsize >= 4 else str('L')
+
+
+class LapHistory(object):
+    """Compact history of a single driver's lap times.
+
+    Lap times in milliseconds are stored in an :class:`array.array` of
+    unsigned 32-bit integers, and the fuel level at the end of each lap
+    in an array of bytes, so each lap takes five bytes of memory.
+    Statistics are computed in batch over these arrays using built-in
+    functions rather than Python-level loops.
+
+    """
+
+    __slots__ = ('times', 'fuel')
+
+    def __init__(self):
+        self.times = array.array(_TIME_TYPECODE)
+        self.fuel = array.array(str('B'))
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        return self.times[index]
+
+    def __iter__(self):
+        return iter(self.times)
+
+    def append(self, laptime, fuel=0):
+        """Add a lap time in milliseconds and the fuel level at the end
+        of the lap."""
+        self.times.append(laptime)
+        self.fuel.append(fuel)
+
+    def clear(self):
+        """Remove all laps."""
+        del self.times[:]
+        del self.fuel[:]
+
+    def percentile(self, p, start=0, stop=None):
+        """Return the `p`-th percentile (0..100) of lap times, using
+        linear interpolation, or `None` if there are no laps."""
+        return _percentiles(sorted(self.times[start:stop]), [p])[0]
+
+    def rolling(self, window):
+        """Return the mean lap times of each `window` consecutive laps
+        as an array of floats."""
+        if window < 1:
+            raise ValueError('Window size out of range')
+        times = self.times
+        if len(times) < window:
+            return array.array(str('d'))
+        sums = array.array(str('d'), _accumulate(times))
+        result = array.array(str('d'), [sums[window - 1] / window])
+        result.extend(map(operator.truediv,
+                          map(operator.sub, sums[window:], sums),
+                          itertools.repeat(window)))
+        return result
+
+    def stats(self, start=0, stop=None):
+        """Return lap time statistics for the given range of laps as a
+        dictionary."""
+        times = self.times[start:stop]
+        n = len(times)
+        if not n:
+            return {'count': 0}
+        total = sum(times)
+        mean = total / n
+        # exact integer arithmetic avoids cancellation errors
+        sumsq = sum(map(operator.mul, times, times))
+        if n > 1:
+            stdev = math.sqrt((n * sumsq - total * total) / (n * (n - 1)))
+        else:
+            stdev = 0.0
+        ordered = sorted(times)
+        p10, median, p90 = _percentiles(ordered, [10, 50, 90])
+        return {
+            'count': n,
+            'total': total,
+            'mean': mean,
+            'stdev': stdev,
+            'min': ordered[0],
+            'max': ordered[-1],
+            'best': times.index(ordered[0]) + start,
+            'median': median,
+            'p10': p10,
+            'p90': p90
+        }
+
+    def fuel_pace(self):
+        """Return the mean lap time for each fuel level as a dictionary."""
+        times = self.times
+        fuel = self.fuel
+        pace = {}
+        for level in set(fuel):
+            mask = list(map(operator.eq, fuel, itertools.repeat(level)))
+            pace[level] = sum(itertools.compress(times, mask)) / sum(mask)
+        return pace
+
+    def asarray(self):
+        """Return lap times as a NumPy array sharing memory with this
+        history; requires the `numpy` package."""
+        import numpy
+        return numpy.frombuffer(self.times, dtype=numpy.dtype(_TIME_TYPECODE))
+
+
+def _percentiles(ordered, ps):
+    n = len(ordered)
+    if not n:
+        return [None] * len(ps)
+    result = []
+    for p in ps:
+        if p < 0 or p > 100:
+            raise ValueError('Percentile out of range')
+        pos = (n - 1) * p / 100
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        result.append(ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo))
+    return result
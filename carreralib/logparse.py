@@ -0,0 +1,189 @@
+"""Streaming parser for :class:`carreralib.ControlUnit` debug logs."""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import ast
+import calendar
+import collections
+import io
+import re
+
+from .cu import ControlUnit
+
+REQUEST = 'request'
+"""Entry kind of a message sent to the CU."""
+
+RETRANSMIT = 'retransmit'
+"""Entry kind of a message sent to the CU again."""
+
+STATUS = 'status'
+"""Entry kind of a :class:`ControlUnit.Status` received."""
+
+TIMER = 'timer'
+"""Entry kind of a :class:`ControlUnit.Timer` received."""
+
+RESPONSE = 'response'
+"""Entry kind of any other response received."""
+
+UNEXPECTED = 'unexpected'
+"""Entry kind of an unexpected response received."""
+
+Entry = collections.namedtuple('Entry', 'timestamp kind value')
+
+_MESSAGES = (
+    ('Sending message ', REQUEST),
+    ('Status from track: ', STATUS),
+    ('Timer from track: ', TIMER),
+    ('Unknown from track: ', RESPONSE),
+    ('Received unexpected message ', UNEXPECTED)
+)
+
+_INT_RE = re.compile(r'\d+')
+
+_BOOL_RE = re.compile(r'True|False')
+
+_MAXCACHE = 1024
+
+
+class _Timestamps(object):
+    """Converts log timestamps to seconds, caching the last second."""
+
+    def __init__(self):
+        self.prefix = None
+        self.seconds = None
+
+    def __call__(self, text):
+        # 'YYYY-mm-dd,HH:MM:SS.fff'
+        prefix = text[:19]
+        if prefix != self.prefix:
+            self.seconds = calendar.timegm((
+                int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                int(text[11:13]), int(text[14:16]), int(text[17:19])
+            ))
+            self.prefix = prefix
+        return self.seconds + int(text[20:23]) / 1000
+
+
+def _bytes(text):
+    if text[:2] == "b'" and text[-1:] == "'" and '\\' not in text:
+        return text[2:-1].encode('latin-1')
+    return ast.literal_eval(text)
+
+
+def _status(text):
+    ints = [int(s) for s in _INT_RE.findall(text)]
+    pit = tuple(s == 'True' for s in _BOOL_RE.findall(text))
+    if len(ints) != 11 or len(pit) != 8:
+        raise ValueError('Invalid status %r' % text)
+    return ControlUnit.Status(tuple(ints[:8]), ints[8], ints[9], pit, ints[10])
+
+
+def _timer(text):
+    ints = _INT_RE.findall(text)
+    if len(ints) != 3:
+        raise ValueError('Invalid timer %r' % text)
+    return ControlUnit.Timer(int(ints[0]), int(ints[1]), int(ints[2]))
+
+
+def parse(lines):
+    """Generate :class:`Entry` tuples from the lines of a
+    :class:`carreralib.ControlUnit` debug log.
+
+    Each entry holds the wall-clock timestamp of the log line in
+    seconds since the epoch, with the log's local time taken as UTC,
+    the entry kind, and the message sent or received, i.e. a
+    :class:`ControlUnit.Status` or :class:`ControlUnit.Timer` for
+    :data:`STATUS` and :data:`TIMER` entries, and bytes otherwise.
+    Lines that do not log a message are skipped.
+
+    """
+    timestamp = _Timestamps()
+    # status and request messages repeat a lot, so cache parsed values
+    cache = {}
+    for line in lines:
+        start = line.find('] ', 23)
+        if start < 0:
+            continue
+        start += 2
+        for prefix, kind in _MESSAGES:
+            if line.startswith(prefix, start):
+                break
+        else:
+            continue
+        text = line[start + len(prefix):].rstrip()
+        try:
+            value = cache[text]
+        except KeyError:
+            try:
+                if kind == STATUS:
+                    value = _status(text)
+                elif kind == TIMER:
+                    value = _timer(text)
+                elif text.endswith(' again'):
+                    value = _bytes(text[:-6])
+                else:
+                    value = _bytes(text)
+            except (SyntaxError, ValueError):
+                continue
+            if kind != TIMER:
+                if len(cache) >= _MAXCACHE:
+                    cache.clear()
+                cache[text] = value
+        if kind == REQUEST and text.endswith(' again'):
+            kind = RETRANSMIT
+        yield Entry(timestamp(line), kind, value)
+
+
+def events(lines):
+    """Generate `(timestamp, event)` tuples for all Status and Timer
+    events logged."""
+    for timestamp, kind, value in parse(lines):
+        if kind == STATUS or kind == TIMER:
+            yield timestamp, value
+
+
+def load(path):
+    """Generate :class:`Entry` tuples from the log file at `path`."""
+    with io.open(path, encoding='utf-8', errors='replace') as f:
+        for entry in parse(f):
+            yield entry
+
+
+def convert(path, recorder):
+    """Write all messages logged in the file at `path` to `recorder`,
+    and return the number of messages written.
+
+    `recorder` is usually a :class:`carreralib.record.Recorder`, so the
+    log can be reloaded quickly using a
+    :class:`carreralib.record.RecordReader`.
+
+    """
+    from .record import RECEIVED, SENT
+    count = 0
+    for timestamp, kind, value in load(path):
+        if kind == REQUEST or kind == RETRANSMIT:
+            recorder.write(value, SENT, timestamp)
+        elif kind == STATUS or kind == TIMER:
+            recorder.write(value.encode(), RECEIVED, timestamp)
+        else:
+            recorder.write(value, RECEIVED, timestamp)
+        count += 1
+    return count
+
+
+def main(args=None):
+    from .record import Recorder
+
+    parser = argparse.ArgumentParser(prog='python -m carreralib.logparse')
+    parser.add_argument('logfile', metavar='LOGFILE')
+    parser.add_argument('output', metavar='OUTPUT')
+    args = parser.parse_args(args)
+
+    with Recorder(args.output, start=next(load(args.logfile), (0,))[0]) as r:
+        count = convert(args.logfile, r)
+    print('%d messages written to %s' % (count, args.output))
+
+
+if __name__ == '__main__':
+    main()
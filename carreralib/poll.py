@@ -0,0 +1,103 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import collections
+import time
+
+from .cu import ControlUnit
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class PollScheduler(object):
+    """Adaptive pacing of status requests sent to a Control Unit.
+
+    The poll rate is chosen from the last response received: while
+    timer events are pending, the CU is polled again immediately;
+    during the start light sequence, polling is fast so the start is
+    detected without delay; while a race is running, the `race` rate
+    is used; and while the race is paused or stopped, polling backs
+    off to the `idle` rate.  All rates are given in polls per second.
+
+    """
+
+    START = 'start'
+    RACE = 'race'
+    IDLE = 'idle'
+    TIMER = 'timer'
+
+    START_LIGHTS = frozenset(range(2, 8))
+    """Start light values indicating the start sequence is active."""
+
+    RACE_LIGHTS = frozenset([0])
+    """Start light values indicating a race is running."""
+
+    def __init__(self, start=100.0, race=50.0, idle=5.0, window=50,
+                 clock=_clock, sleep=time.sleep):
+        self.rates = {
+            self.START: start,
+            self.RACE: race,
+            self.IDLE: idle,
+            self.TIMER: None
+        }
+        self.state = self.IDLE
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__last = None
+        self.__times = collections.deque(maxlen=window)
+
+    @property
+    def target_rate(self):
+        """The current target poll rate, or `None` if unlimited."""
+        return self.rates[self.state]
+
+    @property
+    def rate(self):
+        """The achieved poll rate over the last polls, or `None` if
+        not enough polls have been made yet."""
+        times = self.__times
+        if len(times) < 2 or times[-1] == times[0]:
+            return None
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def delay(self):
+        """Return the time in seconds until the next poll is due."""
+        rate = self.target_rate
+        if rate is None or self.__last is None:
+            return 0.0
+        return max(1.0 / rate - (self.__clock() - self.__last), 0.0)
+
+    def wait(self):
+        """Wait until the next poll is due."""
+        delay = self.delay()
+        if delay > 0:
+            self.__sleep(delay)
+
+    def update(self, data):
+        """Record a poll and adapt the poll rate to its response."""
+        now = self.__clock()
+        self.__last = now
+        self.__times.append(now)
+        if isinstance(data, ControlUnit.Timer):
+            self.state = self.TIMER
+        elif isinstance(data, ControlUnit.Status):
+            if data.start in self.START_LIGHTS:
+                self.state = self.START
+            elif data.start in self.RACE_LIGHTS:
+                self.state = self.RACE
+            else:
+                self.state = self.IDLE
+        return data
+
+    def poll(self, cu):
+        """Wait until the next poll is due, then poll `cu`."""
+        self.wait()
+        return self.update(cu.request())
+
+    def stats(self):
+        """Return the current state, target and achieved poll rates as a
+        dictionary."""
+        return {
+            'state': self.state,
+            'target_rate': self.target_rate,
+            'rate': self.rate
+        }
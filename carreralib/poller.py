@@ -0,0 +1,163 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import collections
+import logging
+import threading
+
+from . import connection
+from . import protocol
+from .cu import ControlUnit
+from .poll import PollScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    """Buffered, iterable stream of events received by a :class:`Poller`.
+
+    At most `maxsize` undelivered events are kept; if the subscriber
+    falls behind, the oldest events are dropped and counted in
+    :attr:`dropped`.  Iteration ends when the subscription or its
+    poller is closed.
+
+    """
+
+    def __init__(self, poller, maxsize=100):
+        self.poller = poller
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.__events = collections.deque()
+        self.__cond = threading.Condition()
+        self.__closed = False
+
+    def __len__(self):
+        return len(self.__events)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            event = self.get()
+            if event is not None:
+                return event
+            elif self.__closed:
+                raise StopIteration
+
+    next = __next__
+
+    def close(self):
+        """Stop receiving events from the poller."""
+        self.poller.unsubscribe(self.put)
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+    def get(self, timeout=None):
+        """Remove and return the oldest event, or `None` on timeout or if
+        the subscription has been closed."""
+        with self.__cond:
+            if not self.__events and not self.__closed:
+                self.__cond.wait(timeout)
+            if not self.__events:
+                return None
+            return self.__events.popleft()
+
+    def put(self, event):
+        """Add an event, dropping the oldest one if the buffer is full."""
+        with self.__cond:
+            if len(self.__events) >= self.maxsize:
+                self.__events.popleft()
+                self.dropped += 1
+            self.__events.append(event)
+            self.__cond.notify()
+
+
+class Poller(threading.Thread):
+    """Background thread polling a :class:`ControlUnit`.
+
+    Each response is decoded once and delivered to all subscribers as
+    a :class:`ControlUnit.Status` or :class:`ControlUnit.Timer` event;
+    consecutive duplicate timer events are only delivered once.  The
+    poll rate is controlled by `scheduler`, which defaults to a new
+    :class:`carreralib.poll.PollScheduler`.
+
+    Usually, a poller is obtained through :meth:`ControlUnit.poller`,
+    :meth:`ControlUnit.events` or :meth:`ControlUnit.subscribe`.
+
+    """
+
+    def __init__(self, cu, scheduler=None):
+        super(Poller, self).__init__(name='carreralib-poller')
+        self.daemon = True
+        self.cu = cu
+        self.scheduler = scheduler or PollScheduler()
+        self.error = None
+        self.errors = 0
+        self.__callbacks = []
+        self.__subscriptions = []
+        self.__lock = threading.Lock()
+        self.__stopped = False
+
+    def events(self, maxsize=100):
+        """Return a new :class:`Subscription` to events."""
+        subscription = Subscription(self, maxsize)
+        with self.__lock:
+            self.__subscriptions.append(subscription)
+            self.__callbacks = self.__callbacks + [subscription.put]
+        return subscription
+
+    def subscribe(self, callback):
+        """Call `callback` with each event received."""
+        with self.__lock:
+            self.__callbacks = self.__callbacks + [callback]
+
+    def unsubscribe(self, callback):
+        """Stop calling `callback` with events received."""
+        with self.__lock:
+            self.__callbacks = [c for c in self.__callbacks if c != callback]
+            self.__subscriptions = [
+                s for s in self.__subscriptions if s.put != callback
+            ]
+
+    def run(self):
+        last = None
+        while not self.__stopped:
+            try:
+                data = self.scheduler.poll(self.cu)
+            except (connection.TimeoutError, protocol.ChecksumError) as e:
+                self.errors += 1
+                logger.warning('Error polling CU: %r', e)
+                continue
+            except Exception as e:
+                if not self.__stopped:
+                    logger.exception('Error polling CU')
+                    self.error = e
+                break
+            if isinstance(data, ControlUnit.Timer) and data == last:
+                continue
+            last = data
+            # callbacks are replaced on change, so no locking is needed
+            for callback in self.__callbacks:
+                try:
+                    callback(data)
+                except Exception:
+                    logger.exception('Error in event callback %r', callback)
+        self.__close()
+
+    def stop(self, timeout=None):
+        """Stop polling and close all subscriptions.
+
+        Unless called from the poller thread itself, this waits up to
+        `timeout` seconds for the poller thread to terminate.
+
+        """
+        self.__stopped = True
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def __close(self):
+        with self.__lock:
+            subscriptions = self.__subscriptions
+        for subscription in subscriptions:
+            subscription.close()
@@ -26,7 +26,110 @@ def chksum(buf, offset=0, size=None):
         raise ValueError("size is negative")
     elif offset + size > n:
         raise ValueError("buffer length < offset + size")
-    return sum(memoryview(buf[offset:offset+size]).tolist()) & 0x0f
+    # slicing a memoryview does not copy the underlying data
+    return sum(memoryview(buf)[offset:offset+size]) & 0x0f
+
+
+class Struct(object):
+    """Compiled protocol format.
+
+    Creating a :class:`Struct` object parses the format string `fmt`
+    once, so repeatedly packing or unpacking data with the same format
+    does not need to parse it again.
+
+    """
+
+    def __init__(self, fmt):
+        packers = []
+        unpackers = []
+        offset = 0
+        for match in re.finditer(_FORMAT_RE, fmt):
+            count, conv = match.groups()
+            if count is None:
+                count = 1
+            else:
+                count = int(count)
+            if conv not in _PACK_FORMATS:
+                raise ValueError('bad character in format')
+            packers.append((_PACK_FORMATS[conv], count))
+            if conv == 'C':
+                if count > offset:
+                    raise ValueError('checksum offset out of range')
+                # unpack checks the `offset - count` bytes preceding it
+                unpackers.append((_unpack_C, offset, offset - count))
+            elif conv != 'x':
+                unpackers.append((_UNPACK_FORMATS[conv], offset, count))
+            offset += _size(conv, count)
+        self.format = fmt
+        self.size = offset
+        self.__packers = tuple(packers)
+        self.__unpackers = tuple(unpackers)
+
+    def pack(self, *args):
+        """Return a bytes object containing the arguments packed
+        according to this object's format.
+
+        """
+        buf = bytearray()
+        argiter = iter(args)
+        for func, count in self.__packers:
+            func(buf, argiter, count)
+        # TODO: check all args used
+        return bytes(buf)
+
+    def unpack(self, buf):
+        """Unpack from the buffer `buf` according to this object's
+        format.
+
+        Raises :exc:`ProtocolError` unless the length of `buf` is
+        :attr:`size`.
+
+        """
+        if len(buf) != self.size:
+            raise ProtocolError('Invalid message length for format %r' % (
+                self.format,
+            ))
+        return self.unpack_from(buf)
+
+    def unpack_from(self, buf, offset=0):
+        """Unpack from the buffer `buf`, starting at position `offset`,
+        according to this object's format.
+
+        `buf` may be any object supporting the buffer interface, which
+        is accessed in place without copying.  Raises
+        :exc:`ProtocolError` if fewer than :attr:`size` bytes are
+        available at `offset`.
+
+        """
+        if offset < 0:
+            raise ValueError("offset is negative")
+        elif len(buf) - offset < self.size:
+            raise ProtocolError('Message too short for format %r' % (
+                self.format,
+            ))
+        result = []
+        view = memoryview(buf)
+        for func, start, count in self.__unpackers:
+            func(result, view, offset + start, count)
+        return tuple(result)
+
+
+def compile(fmt):
+    """Return a :class:`Struct` object for the format string `fmt`.
+
+    Compiled formats are cached, so calling this repeatedly with the
+    same format string is cheap.
+
+    """
+    try:
+        return _cache[fmt]
+    except KeyError:
+        pass
+    struct = Struct(fmt)
+    if len(_cache) >= _MAXCACHE:
+        _cache.clear()
+    _cache[fmt] = struct
+    return struct
 
 
 def pack(fmt, *args):
@@ -34,41 +137,33 @@ def pack(fmt, *args):
     the format string `fmt.`
 
     """
-    buf = bytearray()
-    argiter = iter(args)
-    for match in re.finditer(_FORMAT_RE, fmt):
-        count, conv = match.groups()
-        if count is None:
-            count = 1
-        else:
-            count = int(count)
-        if conv in _PACK_FORMATS:
-            _PACK_FORMATS[conv](buf, argiter, count)
-        else:
-            raise ValueError('bad character in pack format')
-    # TODO: check all args used
-    return bytes(buf)
+    return compile(fmt).pack(*args)
 
 
 def unpack(fmt, buf):
     """Unpack from the buffer `buf` according to the format string `fmt`.
 
     """
-    offset = 0
-    result = []
-    values = memoryview(buf).tolist()
-    for match in re.finditer(_FORMAT_RE, fmt):
-        count, conv = match.groups()
-        if count is None:
-            count = 1
-        else:
-            count = int(count)
-        if conv in _UNPACK_FORMATS:
-            offset += _UNPACK_FORMATS[conv](result, buf, values, offset, count)
-        else:
-            raise ValueError('bad character in unpack format')
-    # TODO: check all buf used
-    return tuple(result)
+    return compile(fmt).unpack(buf)
+
+
+def unpack_from(fmt, buf, offset=0):
+    """Unpack from the buffer `buf`, starting at position `offset`,
+    according to the format string `fmt`.
+
+    """
+    return compile(fmt).unpack_from(buf, offset)
+
+
+def _size(conv, count):
+    if conv == 'B':
+        return count * 2
+    elif conv == 'C':
+        return 1  # count is the checksum's start offset
+    elif conv == 'I':
+        return count * 8
+    else:
+        return count
 
 
 def _pack_B(buf, args, count, base=ord('0')):
@@ -107,11 +202,11 @@ def _pack_I(buf, args, count, base=ord('0')):
         buf.append(base + ((arg >> 4) & 0xf))
 
 
-def _pack_s(buf, args, count, base=ord('0')):
+def _pack_s(buf, args, count, fill=b'0'):
     arg = next(args)
     if not isinstance(arg, bytes):
         raise ValueError("'s' format requires a bytes object")
-    buf.extend(arg.ljust(count, base)[:count])
+    buf.extend(arg.ljust(count, fill)[:count])
 
 
 def _pack_x(buf, args, count, base=ord('0')):
@@ -127,55 +222,50 @@ def _pack_Y(buf, args, count, base=ord('0')):
         buf.append(base + arg)
 
 
-def _unpack_B(result, buf, values, offset, count):
-    for i in range(count):
-        b = values[offset+i*2] & 0x0f
-        b |= (values[offset+i*2+1] & 0x0f) << 4
-        result.append(b)
-    return count * 2
+def _unpack_B(result, buf, offset, count):
+    for i in range(offset, offset + count * 2, 2):
+        result.append((buf[i] & 0x0f) | (buf[i+1] & 0x0f) << 4)
 
 
-def _unpack_C(result, buf, values, offset, count):
-    c = chksum(buf, count, offset - count)
-    if values[offset] & 0xf != c:
+def _unpack_C(result, buf, offset, count):
+    if buf[offset] & 0xf != sum(buf[offset-count:offset]) & 0xf:
         raise ChecksumError()
-    return 1
 
 
-def _unpack_c(result, buf, values, offset, count):
-    for i in range(count):
-        result.append(buf[offset+i:offset+i+1])
-    return count
+def _unpack_c(result, buf, offset, count):
+    for i in range(offset, offset + count):
+        result.append(buf[i:i+1].tobytes())
 
 
-def _unpack_I(result, buf, values, offset, count):
-    for i in range(count):
-        n = (values[offset+0] & 0x0f) << 24
-        n |= (values[offset+1] & 0x0f) << 28
-        n |= (values[offset+2] & 0x0f) << 16
-        n |= (values[offset+3] & 0x0f) << 20
-        n |= (values[offset+4] & 0x0f) << 8
-        n |= (values[offset+5] & 0x0f) << 12
-        n |= (values[offset+6] & 0x0f) << 0
-        n |= (values[offset+7] & 0x0f) << 4
+def _unpack_I(result, buf, offset, count):
+    for i in range(offset, offset + count * 8, 8):
+        n = (buf[i+0] & 0x0f) << 24
+        n |= (buf[i+1] & 0x0f) << 28
+        n |= (buf[i+2] & 0x0f) << 16
+        n |= (buf[i+3] & 0x0f) << 20
+        n |= (buf[i+4] & 0x0f) << 8
+        n |= (buf[i+5] & 0x0f) << 12
+        n |= (buf[i+6] & 0x0f) << 0
+        n |= (buf[i+7] & 0x0f) << 4
         result.append(n)
-    return count * 8
 
 
-def _unpack_s(result, buf, values, offset, count):
-    result.append(buf[offset:offset+count])
-    return count
+def _unpack_s(result, buf, offset, count):
+    result.append(buf[offset:offset+count].tobytes())
+
+
+def _unpack_x(result, buf, offset, count):
+    pass
 
 
-def _unpack_x(result, buf, values, offset, count):
-    return count
+def _unpack_Y(result, buf, offset, count):
+    for i in range(offset, offset + count):
+        result.append(buf[i] & 0xf)
 
 
-def _unpack_Y(result, buf, values, offset, count):
-    for i in range(count):
-        result.append(values[offset+i] & 0xf)
-    return count
+_MAXCACHE = 100
 
+_cache = {}
 
 _FORMAT_RE = re.compile(r'\s*([1-9]\d*|0)?(.)\s*')
 
@@ -0,0 +1,162 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import bisect
+
+from .cu import ControlUnit
+from .laps import LapHistory
+
+
+class Driver(object):
+    """Standings of a single controller in a :class:`RaceState`."""
+
+    __slots__ = ('address', 'num', 'position', 'time', 'laptime', 'bestlap',
+                 'laps', 'pits', 'fuel', 'pit', 'history')
+
+    def __init__(self, address):
+        self.address = address
+        self.num = address + 1
+        self.position = None
+        self.time = None
+        self.laptime = None
+        self.bestlap = None
+        self.laps = 0
+        self.pits = 0
+        self.fuel = 0
+        self.pit = False
+        self.history = LapHistory()
+
+    def __repr__(self):
+        return 'Driver(num=%d, position=%r, laps=%d, time=%r)' % (
+            self.num, self.position, self.laps, self.time
+        )
+
+    @property
+    def key(self):
+        """Sort key of this driver's position."""
+        return (-self.laps, self.time)
+
+
+class RaceState(object):
+    """Incrementally maintained race standings.
+
+    Pass each :class:`ControlUnit.Status` and :class:`ControlUnit.Timer`
+    event to :meth:`update`.  A driver's first timer event marks the
+    start of the first lap; each following one completes a lap.
+    Positions are kept in order as laps are completed, so a single
+    timer event takes O(log n) comparisons to place the driver, and
+    standings never have to be sorted again for display.
+
+    Duplicate or out-of-order timer events, i.e. events with a
+    timestamp not later than the driver's last one, are ignored.
+
+    """
+
+    def __init__(self, drivers=8):
+        self.__ndrivers = drivers
+        self.__listeners = []
+        self.reset()
+
+    def reset(self):
+        """Reset all standings."""
+        self.drivers = [Driver(address) for address in range(self.__ndrivers)]
+        self.start = None
+        self.maxlaps = 0
+        self.status = None
+        self.__order = []
+        self.__keys = []
+
+    @property
+    def leader(self):
+        """The leading :class:`Driver`, or `None` if no driver has
+        crossed the finish line yet."""
+        return self.__order[0] if self.__order else None
+
+    @property
+    def standings(self):
+        """Ordered list of all drivers that crossed the finish line."""
+        return list(self.__order)
+
+    def gap(self, driver):
+        """Return the gap between `driver` and the leader as a
+        ``(laps, time)`` tuple, where `time` is the difference between
+        finish line timestamps if both are on the same lap, and `None`
+        otherwise."""
+        leader = self.leader
+        if driver.time is None or leader is None:
+            return None
+        elif driver.laps == leader.laps:
+            return (0, driver.time - leader.time)
+        else:
+            return (leader.laps - driver.laps, None)
+
+    def subscribe(self, callback):
+        """Call `callback` with the event and the list of drivers whose
+        standings changed after each :meth:`update`."""
+        self.__listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop notifying `callback` of changes."""
+        self.__listeners.remove(callback)
+
+    def update(self, event):
+        """Update standings from a Status or Timer event, and return the
+        list of drivers whose standings changed."""
+        if isinstance(event, ControlUnit.Timer):
+            changed = self.__timer(event)
+        elif isinstance(event, ControlUnit.Status):
+            changed = self.__status(event)
+        else:
+            changed = []
+        if changed:
+            for callback in self.__listeners:
+                callback(event, changed)
+        return changed
+
+    def __status(self, status):
+        changed = []
+        if status == self.status:
+            return changed
+        self.status = status
+        for driver, fuel, pit in zip(self.drivers, status.fuel, status.pit):
+            if fuel != driver.fuel or pit != driver.pit:
+                if pit and not driver.pit:
+                    driver.pits += 1
+                driver.fuel = fuel
+                driver.pit = pit
+                changed.append(driver)
+        return changed
+
+    def __timer(self, timer):
+        driver = self.drivers[timer.address]
+        if driver.time is not None and timer.timestamp <= driver.time:
+            return []
+        order = self.__order
+        keys = self.__keys
+        if driver.time is None:
+            old = len(order)
+        else:
+            old = bisect.bisect_left(keys, driver.key)
+            while order[old] is not driver:
+                old += 1
+            del order[old]
+            del keys[old]
+            driver.laptime = timer.timestamp - driver.time
+            if driver.bestlap is None or driver.laptime < driver.bestlap:
+                driver.bestlap = driver.laptime
+            driver.laps += 1
+            driver.history.append(driver.laptime, driver.fuel)
+        driver.time = timer.timestamp
+        if self.start is None:
+            self.start = timer.timestamp
+        if self.maxlaps < driver.laps:
+            self.maxlaps = driver.laps
+        new = bisect.bisect_right(keys, driver.key)
+        order.insert(new, driver)
+        keys.insert(new, driver.key)
+        for index in range(new, min(old + 1, len(order))):
+            order[index].position = index + 1
+        # gaps of all drivers on the leader's lap change with the leader
+        if new == 0:
+            return list(order)
+        else:
+            return order[new:old + 1]
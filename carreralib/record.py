@@ -0,0 +1,310 @@
+"""Compact binary recordings of Control Unit frames.
+
+A recording starts with a 16-byte file header holding a magic number
+and the recording's start time.  It is followed by records, each
+consisting of an 11-byte record header, i.e. the record kind, the
+payload length, and a timestamp in seconds since the epoch, and its
+payload.  Frames sent to and received from the CU are recorded as is,
+without the leading ``"`` and trailing ``$`` bytes.
+
+Index records are written periodically and each time the leader starts
+a new lap.  Each holds the offset of the previous index record, and up
+to 255 index entries of time, leader lap and record offset.  When a
+recording is closed, a 16-byte trailer pointing to the last index
+record is appended, so readers only have to follow this chain to load
+the index.  Recordings without a trailer, e.g. after a crash, are
+scanned and indexed when opened.
+
+"""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import bisect
+import collections
+import io
+import mmap
+import struct
+import time
+
+from .connection import Connection
+
+MAGIC = b'CARREC\x01\x00'
+
+TRAILER_MAGIC = b'CARIDX\x01\x00'
+
+RECEIVED = 0
+"""Record kind of a frame received from the CU."""
+
+SENT = 1
+"""Record kind of a frame sent to the CU."""
+
+INDEX = 2
+"""Record kind of an index block."""
+
+_HEADER = struct.Struct(str('<8sd'))
+_RECORD = struct.Struct(str('<BBd'))
+_INDEX = struct.Struct(str('<Q'))
+_ENTRY = struct.Struct(str('<dIQ'))
+_TRAILER = struct.Struct(str('<8sQ'))
+
+Record = collections.namedtuple('Record', 'time kind frame')
+
+
+class _LapCounter(object):
+    """Tracks the leader's lap from raw timer frames."""
+
+    def __init__(self):
+        self.crossings = [0] * 16
+        self.maxlaps = 0
+        self.last = None
+
+    def update(self, frame):
+        """Return `True` if `frame` started a new leader lap."""
+        # timer frames are 12 bytes, starting with '?' and an address,
+        # and end with the sector and checksum; only sector 1 timers
+        # are finish line crossings
+        if len(frame) != 12 or frame[:1] != b'?' or frame == self.last:
+            return False
+        self.last = bytes(frame)
+        if bytearray(frame[10:11])[0] & 0x0f != 1:
+            return False
+        address = bytearray(frame[1:2])[0] & 0x0f
+        self.crossings[address] += 1
+        if self.crossings[address] - 1 > self.maxlaps:
+            self.maxlaps = self.crossings[address] - 1
+            return True
+        return False
+
+
+class Recorder(object):
+    """Append-only writer of binary CU recordings.
+
+    An index entry is added every `interval` records, and index entries
+    are written to the file in blocks of up to `blocksize` entries.
+    The recording's start time defaults to the current time.
+
+    """
+
+    def __init__(self, path, interval=1024, blocksize=64, start=None,
+                 clock=time.time):
+        if blocksize < 1 or blocksize > 255:
+            raise ValueError('Index block size out of range')
+        self.__file = io.open(path, 'wb')
+        self.__clock = clock
+        self.__interval = interval
+        self.__blocksize = blocksize
+        self.__count = 0
+        self.__entries = []
+        self.__lastindex = 0
+        self.__laps = _LapCounter()
+        self.__offset = _HEADER.size
+        if start is None:
+            start = clock()
+        self.__file.write(_HEADER.pack(MAGIC, start))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Write the remaining index entries and the trailer, and close
+        the recording."""
+        if self.__file.closed:
+            return
+        if self.__entries:
+            self.__write_index()
+        self.__file.write(_TRAILER.pack(TRAILER_MAGIC, self.__lastindex))
+        self.__file.close()
+
+    def flush(self):
+        """Flush buffered records to the file."""
+        self.__file.flush()
+
+    def write(self, frame, kind=RECEIVED, timestamp=None):
+        """Append a frame to the recording."""
+        if timestamp is None:
+            timestamp = self.__clock()
+        offset = self.__offset
+        if kind == RECEIVED and self.__laps.update(frame):
+            self.__entries.append((timestamp, self.__laps.maxlaps, offset))
+        elif self.__count % self.__interval == 0:
+            self.__entries.append((timestamp, self.__laps.maxlaps, offset))
+        self.__count += 1
+        self.__file.write(_RECORD.pack(kind, len(frame), timestamp))
+        self.__file.write(frame)
+        self.__offset = offset + _RECORD.size + len(frame)
+        if len(self.__entries) >= self.__blocksize:
+            self.__write_index()
+
+    def __write_index(self):
+        entries = self.__entries
+        offset = self.__offset
+        self.__file.write(_RECORD.pack(INDEX, len(entries), entries[-1][0]))
+        self.__file.write(_INDEX.pack(self.__lastindex))
+        for entry in entries:
+            self.__file.write(_ENTRY.pack(*entry))
+        self.__offset += _RECORD.size + _INDEX.size
+        self.__offset += len(entries) * _ENTRY.size
+        self.__lastindex = offset
+        self.__entries = []
+
+
+class RecordingConnection(Connection):
+    """Connection wrapper recording all frames sent and received by
+    `connection` with `recorder`."""
+
+    def __init__(self, connection, recorder):
+        self.connection = connection
+        self.recorder = recorder
+
+    def close(self):
+        try:
+            self.connection.close()
+        finally:
+            self.recorder.close()
+
+    def recv(self, maxlength=None):
+        buf = self.connection.recv(maxlength)
+        self.recorder.write(buf, RECEIVED)
+        return buf
+
+    def send(self, buf, offset=0, size=None):
+        self.connection.send(buf, offset, size)
+        if size is None:
+            size = len(buf) - offset
+        self.recorder.write(memoryview(buf)[offset:offset+size], SENT)
+
+    def sendmany(self, bufs):
+        bufs = list(bufs)
+        self.connection.sendmany(bufs)
+        for buf in bufs:
+            self.recorder.write(buf, SENT)
+
+
+class RecordReader(object):
+    """Memory-mapped reader of binary CU recordings.
+
+    Iterating over a reader, or over the results of :meth:`seek_time`
+    and :meth:`seek_lap`, yields :class:`Record` tuples of timestamp,
+    record kind and frame; frames are memoryviews into the mapped file,
+    so they must be released or copied before the reader is closed.
+
+    """
+
+    def __init__(self, path):
+        with io.open(path, 'rb') as f:
+            self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self.__mmap
+        if len(buf) < _HEADER.size or buf[:len(MAGIC)] != MAGIC:
+            buf.close()
+            raise ValueError('Not a recording: %s' % path)
+        self.start = _HEADER.unpack_from(buf, 0)[1]
+        self.__end = len(buf)
+        entries = self.__read_index()
+        if entries is None:
+            entries = self.__scan_index()
+        self.__times = [entry[0] for entry in entries]
+        self.__laps = [entry[1] for entry in entries]
+        self.__offsets = [entry[2] for entry in entries]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self.__records(_HEADER.size)
+
+    def close(self):
+        """Close the reader."""
+        self.__mmap.close()
+
+    @property
+    def index(self):
+        """List of `(time, lap, offset)` index entries."""
+        return list(zip(self.__times, self.__laps, self.__offsets))
+
+    def seek_time(self, timestamp):
+        """Iterate over records starting at `timestamp`."""
+        n = bisect.bisect_right(self.__times, timestamp)
+        offset = self.__offsets[n - 1] if n else _HEADER.size
+        for record in self.__records(offset):
+            if record.time >= timestamp:
+                yield record
+
+    def seek_lap(self, lap):
+        """Iterate over records starting at the frame that completed the
+        leader's `lap`."""
+        n = bisect.bisect_left(self.__laps, lap)
+        if lap <= 0:
+            offset = _HEADER.size
+        elif n < len(self.__laps):
+            offset = self.__offsets[n]
+        else:
+            offset = self.__end
+        return self.__records(offset)
+
+    def __records(self, offset):
+        buf = self.__mmap
+        view = memoryview(buf)
+        end = self.__end
+        while offset + _RECORD.size <= end:
+            kind, size, timestamp = _RECORD.unpack_from(buf, offset)
+            offset += _RECORD.size
+            if kind == INDEX:
+                offset += _INDEX.size + size * _ENTRY.size
+                continue
+            if offset + size > end:
+                break
+            yield Record(timestamp, kind, view[offset:offset+size])
+            offset += size
+
+    def __read_index(self):
+        buf = self.__mmap
+        end = len(buf) - _TRAILER.size
+        if end < _HEADER.size:
+            return None
+        magic, offset = _TRAILER.unpack_from(buf, end)
+        if magic != TRAILER_MAGIC:
+            return None
+        self.__end = end
+        blocks = []
+        while offset:
+            kind, size, _ = _RECORD.unpack_from(buf, offset)
+            if kind != INDEX:
+                raise ValueError('Invalid index offset %d' % offset)
+            start = offset + _RECORD.size + _INDEX.size
+            blocks.append([
+                _ENTRY.unpack_from(buf, start + n * _ENTRY.size)
+                for n in range(size)
+            ])
+            offset, = _INDEX.unpack_from(buf, offset + _RECORD.size)
+        return [entry for block in reversed(blocks) for entry in block]
+
+    def __scan_index(self):
+        # recording was not closed, so rebuild index from records
+        entries = []
+        laps = _LapCounter()
+        offset = _HEADER.size
+        buf = self.__mmap
+        while offset + _RECORD.size <= self.__end:
+            kind, size, timestamp = _RECORD.unpack_from(buf, offset)
+            if kind == INDEX:
+                start = offset + _RECORD.size + _INDEX.size
+                if start + size * _ENTRY.size > self.__end:
+                    break
+                entries.extend(
+                    _ENTRY.unpack_from(buf, start + n * _ENTRY.size)
+                    for n in range(size)
+                )
+                offset = start + size * _ENTRY.size
+                continue
+            start = offset + _RECORD.size
+            if kind == RECEIVED and laps.update(buf[start:start+size]):
+                entries.append((timestamp, laps.maxlaps, offset))
+            offset = start + size
+        # lap entries may also have been written to index blocks
+        return sorted(set(entries), key=lambda entry: entry[2])
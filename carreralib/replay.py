@@ -0,0 +1,173 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import collections
+import io
+import logging
+import time
+
+from . import logparse
+from .connection import BufferTooShort, Connection, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_VERSION = b'05331<'
+
+Exchange = collections.namedtuple('Exchange', 'request responses')
+
+
+def exchanges(lines):
+    """Generate the recorded exchanges from the lines of a
+    :class:`carreralib.ControlUnit` debug log.
+
+    Each exchange is a `(request, responses)` tuple, where `responses`
+    is a list of `(timestamp, message)` tuples holding the raw response
+    messages in the order they were received, including unexpected
+    ones.
+
+    """
+    request = None
+    responses = []
+    for timestamp, kind, value in logparse.parse(lines):
+        if kind == logparse.RETRANSMIT:
+            continue
+        elif kind == logparse.REQUEST:
+            if request is not None:
+                yield Exchange(request, responses)
+            request = value
+            responses = []
+        elif request is None:
+            continue
+        elif kind == logparse.STATUS or kind == logparse.TIMER:
+            responses.append((timestamp, value.encode()))
+        else:
+            responses.append((timestamp, value))
+    if request is not None:
+        yield Exchange(request, responses)
+
+
+class ReplayConnection(Connection):
+    """Connection answering requests with the responses recorded in a
+    :class:`carreralib.ControlUnit` debug log.
+
+    Each ``?`` request is answered with the next recorded ``?``
+    response, so track events are replayed in their original order no
+    matter which other commands are sent.  Other requests are answered
+    with their recorded response if they match the next recorded
+    request, or with a plain echo otherwise.
+
+    `speed` selects the replay timing: ``1`` replays responses at
+    their original pace, other values scale it, and ``None`` or ``0``
+    replays as fast as possible.  `path` may specify options as a URL
+    query string, e.g. ``logs/twoCarRace.log?speed=10``.  With `loop`
+    set, replay restarts at the beginning of the log when the end is
+    reached; otherwise :exc:`EOFError` is raised.
+
+    """
+
+    def __init__(self, path, timeout=None, speed=None, loop=False):
+        path, _, query = path.partition('?')
+        for option in filter(None, query.split('&')):
+            name, _, value = option.partition('=')
+            if name == 'speed':
+                speed = float(value)
+            elif name == 'loop':
+                loop = value.lower() in ('', '1', 'true', 'yes')
+            else:
+                raise ValueError('Unknown replay option %r' % name)
+        self.__path = path
+        self.__speed = speed
+        self.__loop = loop
+        self.__version = _DEFAULT_VERSION
+        self.__pending = collections.deque()
+        self.__request = None
+        self.__start = None
+        self.__open()
+
+    def close(self):
+        self.__file.close()
+
+    def recv(self, maxlength=None):
+        if not self.__pending:
+            raise TimeoutError('No response recorded for request')
+        timestamp, buf = self.__pending.popleft()
+        if self.__speed and timestamp is not None:
+            self.__wait(timestamp)
+        if maxlength is not None and maxlength < len(buf):
+            raise BufferTooShort('Buffer too short for data received')
+        return buf
+
+    def send(self, buf, offset=0, size=None):
+        n = len(buf)
+        if offset < 0:
+            raise ValueError("offset is negative")
+        elif n < offset:
+            raise ValueError("buffer length < offset")
+        elif size is None:
+            size = n - offset
+        elif size < 0:
+            raise ValueError("size is negative")
+        elif offset + size > n:
+            raise ValueError("buffer length < offset + size")
+        buf = bytes(buf[offset:offset+size])
+        if buf == self.__request and self.__pending:
+            return  # resent request, recorded responses still pending
+        self.__request = buf
+        self.__pending.clear()
+        if buf.startswith(b'?'):
+            self.__pending.extend(self.__next_poll().responses)
+            return
+        exchange = self.__peek()
+        if exchange and exchange.request == buf and exchange.responses:
+            self.__lookahead = None
+            self.__pending.extend(exchange.responses)
+        elif buf.startswith(b'0'):
+            self.__pending.append((None, self.__version))
+        else:
+            self.__pending.append((None, buf[0:1]))
+
+    def sendmany(self, bufs):
+        # responses to all messages are pending, in the order sent
+        pending = []
+        for buf in bufs:
+            self.send(buf)
+            pending.extend(self.__pending)
+            self.__pending.clear()
+        self.__pending.extend(pending)
+
+    def __open(self):
+        self.__file = io.open(self.__path, encoding='utf-8')
+        self.__exchanges = exchanges(self.__file)
+        self.__lookahead = None
+
+    def __peek(self):
+        if self.__lookahead is None:
+            self.__lookahead = next(self.__exchanges, None)
+            exchange = self.__lookahead
+            if exchange and exchange.request == b'0' and exchange.responses:
+                self.__version = exchange.responses[-1][1]
+        return self.__lookahead
+
+    def __next_poll(self):
+        restarted = False
+        while True:
+            exchange = self.__peek()
+            self.__lookahead = None
+            if exchange is None:
+                if not self.__loop or restarted:
+                    raise EOFError('End of replay log %s' % self.__path)
+                logger.debug('Restarting replay of %s', self.__path)
+                self.__file.close()
+                self.__open()
+                self.__start = None
+                restarted = True
+            elif exchange.request.startswith(b'?') and exchange.responses:
+                return exchange
+
+    def __wait(self, timestamp):
+        now = time.time()
+        if self.__start is None:
+            self.__start = (now, timestamp)
+        start, origin = self.__start
+        delay = start + (timestamp - origin) / self.__speed - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,98 @@
+"""Incremental redrawing of curses windows."""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import time
+
+
+def startlights(start, now):
+    """Return the number of start lights lit for the CU's start value
+    `start` at time `now` in seconds."""
+    if start == 0 or start == 7:
+        return 0
+    elif start == 1:
+        return 5
+    elif start < 7:
+        return start - 1
+    elif int(now * 2) % 2 == 0:  # A_BLINK may not be supported
+        return 5
+    else:
+        return 0
+
+
+class Screen(object):
+    """Redraws only the lines of a curses `window` that changed.
+
+    A frame is started by :meth:`begin` at most `fps` times per second,
+    and finished by :meth:`end`, which only refreshes the window if any
+    line drawn in between differs from the previous frame.  Start
+    lights are highlighted using the attribute `lightattr`.
+
+    """
+
+    def __init__(self, window, fps=20, lightattr=0, clock=time.time):
+        self.window = window
+        self.lightattr = lightattr
+        self.interval = 1.0 / fps if fps else 0.0
+        self.clock = clock
+        self.nextframe = 0
+        self.size = None
+        self.lines = {}
+        self.changed = False
+
+    def delay(self):
+        """Return the time in seconds until the next frame is due."""
+        return max(self.nextframe - self.clock(), 0)
+
+    def begin(self):
+        """Start a new frame and return the window size as a tuple
+        ``(nlines, ncols)``, or `None` if the next frame is not due.
+
+        If the window size changed since the last frame, the window is
+        cleared, so all lines are drawn again.
+
+        """
+        now = self.clock()
+        if now < self.nextframe:
+            return None
+        self.nextframe = now + self.interval
+        size = self.window.getmaxyx()
+        if size != self.size:
+            self.size = size
+            self.lines.clear()
+            self.window.clear()
+        self.changed = False
+        return size
+
+    def draw(self, row, text, n, attr=0, lights=0):
+        """Draw at most `n` characters of `text` in line `row`, with
+        `lights` start lights, unless the line did not change."""
+        line = (text, attr, lights)
+        if self.lines.get(row) == line:
+            return
+        window = self.window
+        window.move(row, 0)
+        window.clrtoeol()
+        if text:
+            window.addnstr(row, 0, text, n, attr)
+        if lights:
+            window.chgat(row, 0, 2 * lights, self.lightattr)
+        if text:
+            self.lines[row] = line
+        else:
+            self.lines.pop(row, None)
+        self.changed = True
+
+    def erase(self, start, stop):
+        """Erase the lines from `start` up to, but not including,
+        `stop`."""
+        for row in range(start, stop):
+            if row in self.lines:
+                self.draw(row, '', 0)
+
+    def end(self):
+        """Finish the frame, and return whether the window was
+        refreshed."""
+        if self.changed:
+            self.window.refresh()
+        return self.changed
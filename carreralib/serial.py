@@ -9,23 +9,35 @@ class SerialConnection(Connection):
 
     def __init__(self, url, timeout=None):
         self.__serial = serial_for_url(url, baudrate=19200, timeout=timeout)
+        self.__buffer = bytearray()
+        self.__output = bytearray()
 
     def close(self):
         self.__serial.close()
+        del self.__buffer[:]
 
     def recv(self, maxlength=None):
-        buf = bytearray()
+        buf = self.__buffer
+        start = 0
         while True:
-            c = self.__serial.read()
-            if not c:
-                raise TimeoutError('Timeout waiting for serial data')
-            elif c == b'$':
+            end = buf.find(b'$', start)
+            if end >= 0:
                 break
-            elif maxlength is not None and maxlength <= len(buf):
+            elif maxlength is not None and maxlength < len(buf):
+                del buf[:]
                 raise BufferTooShort('Buffer too short for data received')
-            else:
-                buf.extend(c)
-        return bytes(buf)
+            # read everything available, or block for at least one byte
+            data = self.__serial.read(self.__serial.in_waiting or 1)
+            if not data:
+                raise TimeoutError('Timeout waiting for serial data')
+            start = len(buf)
+            buf.extend(data)
+        if maxlength is not None and maxlength < end:
+            del buf[:end+1]
+            raise BufferTooShort('Buffer too short for data received')
+        res = bytes(buf[:end])
+        del buf[:end+1]
+        return res
 
     def send(self, buf, offset=0, size=None):
         n = len(buf)
@@ -39,7 +51,20 @@ class SerialConnection(Connection):
             raise ValueError("size is negative")
         elif offset + size > n:
             raise ValueError("buffer length < offset + size")
-        self.__serial.write(b'"')
-        self.__serial.write(buf[offset:offset+size])
-        self.__serial.write(b'$')
-        self.__serial.flush()
+        out = self.__output
+        del out[:]
+        _frame(out, memoryview(buf)[offset:offset+size])
+        self.__serial.write(out)
+
+    def sendmany(self, bufs):
+        out = self.__output
+        del out[:]
+        for buf in bufs:
+            _frame(out, buf)
+        self.__serial.write(out)
+
+
+def _frame(out, data):
+    out.append(0x22)  # '"'
+    out.extend(data)
+    out.append(0x24)  # '$'
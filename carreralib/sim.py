@@ -0,0 +1,386 @@
+"""Simulated Control Unit for testing without a track attached.
+
+The simulator answers the requests sent by :class:`ControlUnit` with
+responses created from the same protocol formats, either in-process
+through a :class:`SimulatedConnection`, or over a pseudo-terminal
+using a :class:`PtyServer`, so the complete serial stack can be
+exercised.  Simulated time may run faster than real time, and faults
+seen on real hardware can be injected at configurable rates.
+
+"""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import collections
+import heapq
+import logging
+import os
+import random
+import select
+import threading
+import time
+
+from . import protocol
+from .connection import BufferTooShort, Connection, TimeoutError
+from .cu import ControlUnit
+
+logger = logging.getLogger(__name__)
+
+_IGNORE_FORMAT = protocol.Struct('xBC')
+_SETWORD_FORMAT = protocol.Struct('xBYYC')
+_VERSION_FORMAT = protocol.Struct('c4sC')
+
+# delay between start lights, and before lights out, in milliseconds
+_LIGHT_DELAY = 1000
+
+_FAULTS = ('wrong', 'checksum', 'drop')
+
+_FLOAT_OPTIONS = ('laptime', 'stdev', 'burn', 'pittime', 'speed') + _FAULTS
+
+
+class _Car(object):
+
+    __slots__ = ('address', 'laptime', 'fuel', 'pit', 'pitend', 'next',
+                 'laps', 'speed', 'brake', 'fuelrate')
+
+    def __init__(self, address, laptime):
+        self.address = address
+        self.laptime = laptime
+        self.fuel = 15.0
+        self.pit = False
+        self.pitend = None
+        self.next = None
+        self.laps = 0
+        self.speed = 15
+        self.brake = 15
+        self.fuelrate = 15
+
+
+class Simulator(object):
+    """Simulated Carrera Digital 124/132 Control Unit.
+
+    `cars` cars with addresses starting at zero lap the track while
+    the start light indicator is zero.  Lap times are normally
+    distributed with mean `laptime` milliseconds, which may also be a
+    sequence of per-car means, and standard deviation `stdev`.  Each
+    lap burns `burn` fuel levels; when a car's fuel drops below
+    `pitlevel`, it refuels in the pit lane for `pittime` milliseconds
+    on its next lap.  Set `burn` to zero to disable fuel mode.
+
+    Simulated time runs `speed` times as fast as `clock`.  Faults are
+    injected at the given per-response rates: `wrong` answers a
+    request with the response to a different one, `checksum` corrupts
+    the response's checksum, and `drop` removes a single byte from it.
+
+    The simulator starts in free driving mode.  The start key stops a
+    race, or starts the start light sequence if the race is stopped.
+
+    """
+
+    def __init__(self, cars=2, laptime=5000, stdev=250, burn=0.5,
+                 pitlevel=3, pittime=3000, speed=1.0, version=b'5331',
+                 seed=None, wrong=0.0, checksum=0.0, drop=0.0,
+                 clock=time.time):
+        if cars < 1 or cars > 8:
+            raise ValueError('Number of cars out of range')
+        if speed <= 0:
+            raise ValueError('Speed must be positive')
+        try:
+            laptimes = list(laptime)
+        except TypeError:
+            laptimes = [laptime * (1 + n / 50) for n in range(cars)]
+        if len(laptimes) < cars:
+            raise ValueError('Not enough lap times for %d cars' % cars)
+        self.cars = [_Car(n, laptimes[n]) for n in range(cars)]
+        self.stdev = stdev
+        self.burn = burn
+        self.pitlevel = pitlevel
+        self.pittime = pittime
+        self.speed = speed
+        self.version = version
+        self.faults = {'wrong': wrong, 'checksum': checksum, 'drop': drop}
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.start = 0
+        self.mask = 0
+        self.display = {}
+        self.counts = dict.fromkeys(('requests', 'timers') + _FAULTS, 0)
+        self.__origin = clock()
+        self.__timer = 0
+        self.__stopped = None
+        self.__lights = None
+        self.__pending = []
+        self.__last = b'J'
+        for car in self.cars:
+            car.next = self.random.uniform(0, car.laptime)
+
+    @property
+    def mode(self):
+        """The mode bit mask reported in status responses."""
+        Status = ControlUnit.Status
+        if self.burn:
+            return Status.FUEL_MODE | Status.PIT_LANE_MODE
+        return 0
+
+    def now(self):
+        """Return the current simulated time in milliseconds."""
+        return (self.clock() - self.__origin) * self.speed * 1000
+
+    def status(self):
+        """Return the current :class:`ControlUnit.Status`."""
+        fuel = [0] * 8
+        pit = [False] * 8
+        for car in self.cars:
+            fuel[car.address] = int(car.fuel + 0.5)
+            pit[car.address] = car.pit
+        return ControlUnit.Status(tuple(fuel), self.start, self.mode,
+                                  tuple(pit), 8)
+
+    def request(self, buf):
+        """Return the response message for request `buf`, including
+        injected faults."""
+        buf = bytes(buf)
+        self.counts['requests'] += 1
+        res = self.respond(buf)
+        if self.__inject('wrong'):
+            res, self.__last = self.__last, res
+        else:
+            self.__last = res
+        if len(res) > 1 and self.__inject('checksum'):
+            res = res[:-1] + (b'1' if res.endswith(b'0') else b'0')
+        if res and self.__inject('drop'):
+            n = self.random.randrange(len(res))
+            res = res[:n] + res[n+1:]
+        return res
+
+    def respond(self, buf):
+        """Return the correct response message for request `buf`."""
+        now = self.now()
+        self.__advance(now)
+        command = buf[0:1]
+        if command == b'?':
+            if self.__pending:
+                _, address, timestamp = heapq.heappop(self.__pending)
+                self.counts['timers'] += 1
+                timer = ControlUnit.Timer(address, timestamp & 0xffffffff, 1)
+                return timer.encode()
+            return self.status().encode()
+        elif command == b'0':
+            return _VERSION_FORMAT.pack(b'0', self.version)
+        elif command == b'J':
+            self.__setword(*_SETWORD_FORMAT.unpack(buf)[:2])
+        elif command == b':':
+            self.mask, = _IGNORE_FORMAT.unpack(buf)
+        elif command == b'=':
+            self.__timer = now
+            del self.__pending[:]
+        elif buf == ControlUnit.START_KEY:
+            self.__start_key(now)
+        return command
+
+    def __inject(self, fault):
+        rate = self.faults[fault]
+        if rate and self.random.random() < rate:
+            self.counts[fault] += 1
+            return True
+        return False
+
+    def __setword(self, cmd, value):
+        word, address = cmd & 0x1f, cmd >> 5
+        car = self.cars[address] if address < len(self.cars) else None
+        if word == 0 and car is not None:
+            car.speed = value
+        elif word == 1 and car is not None:
+            car.brake = value
+        elif word == 2 and car is not None:
+            car.fuelrate = value
+        else:
+            self.display[(word, address)] = value
+
+    def __start_key(self, now):
+        if self.start == 0:
+            self.start = 1
+            self.__stopped = now
+        elif self.start == 1:
+            self.start = 2
+            self.__lights = now
+
+    def __advance(self, now):
+        if self.__lights is not None:
+            lights = 2 + int((now - self.__lights) // _LIGHT_DELAY)
+            if lights <= 7:
+                self.start = lights
+            else:
+                self.start = 0
+                self.__resume(self.__lights + 6 * _LIGHT_DELAY)
+                self.__lights = None
+        if self.start != 0:
+            return
+        for car in self.cars:
+            if car.pitend is not None and car.pitend <= now:
+                car.pit = False
+                car.pitend = None
+            while car.next <= now:
+                self.__cross(car)
+
+    def __resume(self, now):
+        # cars continue where they stopped
+        for car in self.cars:
+            car.next += now - self.__stopped
+        self.__stopped = None
+
+    def __cross(self, car):
+        timestamp = car.next
+        if not self.mask & (1 << car.address):
+            heapq.heappush(self.__pending, (
+                timestamp, car.address, int(timestamp - self.__timer)
+            ))
+        car.laps += 1
+        laptime = max(self.random.gauss(car.laptime, self.stdev),
+                      car.laptime / 2)
+        if self.burn:
+            car.fuel = max(car.fuel - self.burn * (car.fuelrate + 1) / 16, 0)
+            if car.fuel < self.pitlevel:
+                car.pit = True
+                car.pitend = timestamp + self.pittime
+                car.fuel = 15.0
+                laptime += self.pittime
+        car.next = timestamp + laptime
+
+
+class SimulatedConnection(Connection):
+    """In-process connection to a :class:`Simulator`.
+
+    Keyword arguments are passed to the simulator if `simulator` is
+    not given.  `options` may specify simulator options as a URL query
+    string, e.g. ``cars=4&speed=10``.
+
+    """
+
+    def __init__(self, options='', timeout=None, simulator=None, **kwargs):
+        kwargs.update(parse_options(options))
+        self.simulator = simulator or Simulator(**kwargs)
+        self.__pending = collections.deque()
+
+    def recv(self, maxlength=None):
+        if not self.__pending:
+            raise TimeoutError('No request pending')
+        buf = self.__pending.popleft()
+        if maxlength is not None and maxlength < len(buf):
+            raise BufferTooShort('Buffer too short for data received')
+        return buf
+
+    def send(self, buf, offset=0, size=None):
+        n = len(buf)
+        if offset < 0:
+            raise ValueError("offset is negative")
+        elif n < offset:
+            raise ValueError("buffer length < offset")
+        elif size is None:
+            size = n - offset
+        elif size < 0:
+            raise ValueError("size is negative")
+        elif offset + size > n:
+            raise ValueError("buffer length < offset + size")
+        res = self.simulator.request(buf[offset:offset+size])
+        self.__pending.append(res)
+
+
+class PtyServer(object):
+    """Serve a :class:`Simulator` on the master side of a pseudo-terminal.
+
+    The name of the slave device, which can be opened like any serial
+    port, is available as :attr:`device`.  Requests are answered from a
+    background thread until the server is closed.  Responses to the
+    requests read at once are written after `latency` seconds, e.g.
+    to model the latency timer of USB serial adapters.
+
+    """
+
+    def __init__(self, simulator, latency=0):
+        self.simulator = simulator
+        self.latency = latency
+        self.__master, self.__slave = os.openpty()
+        self.device = os.ttyname(self.__slave)
+        self.__closed = threading.Event()
+        self.__thread = threading.Thread(target=self.serve_forever)
+        self.__thread.daemon = True
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Start serving requests in a background thread."""
+        self.__thread.start()
+
+    def close(self):
+        """Stop serving requests and close the pseudo-terminal."""
+        self.__closed.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        os.close(self.__master)
+        os.close(self.__slave)
+
+    def serve_forever(self, poll_interval=0.1):
+        """Serve requests until the server is closed."""
+        buf = b''
+        while not self.__closed.is_set():
+            if not select.select([self.__master], [], [], poll_interval)[0]:
+                continue
+            buf += os.read(self.__master, 1024)
+            out = []
+            while b'$' in buf:
+                request, _, buf = buf.partition(b'$')
+                # discard anything before the start of the request
+                request = request[request.rfind(b'"') + 1:]
+                if request:
+                    out.append(self.simulator.request(request) + b'$')
+            if out:
+                if self.latency:
+                    time.sleep(self.latency)
+                os.write(self.__master, b''.join(out))
+
+
+def parse_options(options):
+    """Parse simulator options given as a URL query string."""
+    kwargs = {}
+    for option in filter(None, options.split('&')):
+        name, _, value = option.partition('=')
+        if name in ('cars', 'seed', 'pitlevel'):
+            kwargs[name] = int(value)
+        elif name in _FLOAT_OPTIONS:
+            kwargs[name] = float(value)
+        else:
+            raise ValueError('Unknown simulator option %r' % name)
+    return kwargs
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m carreralib.sim')
+    parser.add_argument('options', metavar='OPTIONS', nargs='?', default='',
+                        help='simulator options, e.g. "cars=4&speed=10"')
+    parser.add_argument('-l', '--logfile', default='carreralib.log',
+                        help='where to write log messages')
+    parser.add_argument('-d', '--latency', default=0, type=float,
+                        help='response latency in seconds')
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO, filename=args.logfile)
+    simulator = Simulator(**parse_options(args.options))
+    with PtyServer(simulator, args.latency) as server:
+        print('Simulated CU listening on %s' % server.device)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    print('%(requests)d requests, %(timers)d timer events' % simulator.counts)
+
+
+if __name__ == '__main__':
+    main()
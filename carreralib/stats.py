@@ -0,0 +1,75 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import bisect
+
+
+class Histogram(object):
+    """Histogram of latencies in seconds with fixed bucket bounds."""
+
+    BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+    """Default upper bucket bounds in seconds."""
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add a single value to the histogram."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        """Return the histogram's current state as a dictionary."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+            'buckets': list(zip(self.bounds + (None,), self.counts))
+        }
+
+
+class RequestStats(object):
+    """Counters and per-command latency histograms for CU requests."""
+
+    def __init__(self):
+        self.sends = 0
+        self.retransmits = 0
+        self.unexpected = 0
+        self.checksum_errors = 0
+        self.timeouts = 0
+        self.buffered = 0
+        self.latency = {}
+
+    def add_latency(self, command, value):
+        """Add a request latency for the command byte `command`."""
+        try:
+            histogram = self.latency[command]
+        except KeyError:
+            histogram = self.latency[command] = Histogram()
+        histogram.add(value)
+
+    def snapshot(self):
+        """Return the current statistics as a dictionary."""
+        return {
+            'sends': self.sends,
+            'retransmits': self.retransmits,
+            'unexpected': self.unexpected,
+            'checksum_errors': self.checksum_errors,
+            'timeouts': self.timeouts,
+            'buffered': self.buffered,
+            'latency': {
+                command.decode('latin-1'): histogram.snapshot()
+                for command, histogram in self.latency.items()
+            }
+        }
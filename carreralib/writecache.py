@@ -0,0 +1,233 @@
+"""Write-behind cache for Control Unit settings and displays."""
+
+from __future__ import absolute_import, division, unicode_literals
+
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# words reset by clearing the Position Tower
+_DISPLAY_WORDS = frozenset([6, 17, 18])
+
+# pending key of Position Tower resets, which must not be coalesced
+# with setting the position of controller #1
+_CLRPOS = 'clrpos'
+
+
+class WriteCache(object):
+    """Write-behind cache for :meth:`ControlUnit.setword` commands.
+
+    The last value written for each command word and address is
+    remembered, so writing the same value again does not send anything
+    to the CU.  Writes are queued and sent by :meth:`flush`, or by a
+    background thread after :meth:`start`; if a value is written again
+    before it was sent, only the latest value is sent, so bursts of
+    Position Tower updates cost at most one command per display slot.
+
+    Writes that fail are sent again, after `retry` seconds when sent
+    from the background thread.
+
+    The cache assumes it is the only writer of these settings; call
+    :meth:`invalidate` if the CU may have been changed otherwise, e.g.
+    after reconnecting.
+
+    """
+
+    def __init__(self, cu, retry=0.1):
+        self.cu = cu
+        self.retry = retry
+        self.writes = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.__values = {}
+        self.__pending = collections.OrderedDict()
+        self.__cond = threading.Condition()
+        self.__thread = None
+        self.__sending = None
+        self.__generation = 0
+        self.__closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.__pending)
+
+    def start(self):
+        """Start sending queued writes from a background thread."""
+        with self.__cond:
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name='carreralib-writecache'
+                )
+                self.__thread.daemon = True
+                self.__thread.start()
+
+    def close(self, timeout=None):
+        """Stop the background thread after sending queued writes.
+
+        Writes that fail after the cache was closed are discarded.
+
+        """
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+            thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def flush(self, timeout=None):
+        """Send all queued writes.
+
+        If the background thread is running, this waits up to `timeout`
+        seconds for it to send all queued writes, and returns whether
+        it did so.
+
+        """
+        if self.__thread is None:
+            while self.__send():
+                pass
+            return not self.__pending
+        end = None if timeout is None else time.time() + timeout
+        with self.__cond:
+            while self.__pending or self.__sending:
+                if end is None:
+                    self.__cond.wait()
+                elif end > time.time():
+                    self.__cond.wait(end - time.time())
+                else:
+                    return False
+            return True
+
+    def invalidate(self):
+        """Forget all values written, so they are sent again."""
+        with self.__cond:
+            self.__values.clear()
+
+    def stats(self):
+        """Return write statistics as a dictionary."""
+        return {
+            'writes': self.writes,
+            'skipped': self.skipped,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'pending': len(self.__pending)
+        }
+
+    def clrpos(self):
+        """Clear/reset the Position Tower display."""
+        with self.__cond:
+            for key in list(self.__pending):
+                if key == _CLRPOS or key[0] in _DISPLAY_WORDS:
+                    del self.__pending[key]
+                    self.coalesced += 1
+            for key in list(self.__values):
+                if key[0] in _DISPLAY_WORDS:
+                    del self.__values[key]
+            # display words being sent are reset by this, too
+            self.__generation += 1
+            self.__pending[_CLRPOS] = (6, 0, 9, 1)
+            self.__cond.notify()
+
+    def setbrake(self, address, value):
+        """Set the brake value for controller `address`."""
+        self.setword(1, address, value, repeat=2)
+
+    def setfuel(self, address, value):
+        """Set the fuel value for controller `address`."""
+        self.setword(2, address, value, repeat=2)
+
+    def setlap(self, value):
+        """Set the current lap displayed by the Position Tower."""
+        if value < 0 or value > 255:
+            raise ValueError('Lap value out of range')
+        self.setword(17, 7, value >> 4)
+        self.setword(18, 7, value & 0xf)
+
+    def setpos(self, address, position):
+        """Set the controller's position displayed by the Position Tower."""
+        if position < 1 or position > 8:
+            raise ValueError('Position out of range')
+        self.setword(6, address, position)
+
+    def setspeed(self, address, value):
+        """Set the speed value for controller `address`."""
+        self.setword(0, address, value, repeat=2)
+
+    def setword(self, word, address, value, repeat=1):
+        """Queue a :meth:`ControlUnit.setword` command, unless `value`
+        is the last value written."""
+        key = (word, address)
+        with self.__cond:
+            if key in self.__pending:
+                del self.__pending[key]
+                self.coalesced += 1
+            if self.__current(self.__sending) and self.__sending[0] == key:
+                last = self.__sending[1]
+            else:
+                last = self.__values.get(key)
+            if last == value:
+                self.skipped += 1
+            else:
+                self.__pending[key] = (word, address, value, repeat)
+                self.__cond.notify()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                while not self.__pending and not self.__closed:
+                    self.__cond.wait()
+                if not self.__pending:
+                    break
+            if not self.__send():
+                with self.__cond:
+                    if self.__closed:
+                        break
+                    self.__cond.wait(self.retry)
+
+    def __send(self):
+        with self.__cond:
+            if not self.__pending:
+                return False
+            key, args = self.__pending.popitem(last=False)
+            word, address, value, repeat = args
+            sending = self.__sending = (key, value, self.__generation)
+        try:
+            self.cu.setword(word, address, value, repeat)
+        except Exception as e:
+            logger.warning('Error writing %r: %r', args, e)
+            with self.__cond:
+                self.errors += 1
+                # retry later, unless a newer value was queued or the
+                # display was cleared meanwhile
+                if key not in self.__pending and self.__current(sending):
+                    items = list(self.__pending.items())
+                    self.__pending.clear()
+                    self.__pending[key] = args
+                    self.__pending.update(items)
+                self.__sending = None
+                self.__cond.notify_all()
+            return False
+        with self.__cond:
+            self.writes += 1
+            if key != _CLRPOS and self.__current(sending):
+                self.__values[key] = value
+            self.__sending = None
+            self.__cond.notify_all()
+        return True
+
+    def __current(self, sending):
+        # display words sent before the last clrpos are out of date
+        if sending is None:
+            return False
+        key, _, generation = sending
+        if key == _CLRPOS or key[0] not in _DISPLAY_WORDS:
+            return True
+        return generation == self.__generation
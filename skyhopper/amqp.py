@@ -0,0 +1,266 @@
+import collections
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PikaTransport(object):
+    """
+    AMQP transport based on :class:`pika.SelectConnection`.
+
+    On connecting, this declares the exchange and puts the channel in
+    publisher confirm mode.  The connection's I/O loop runs in a thread
+    of its own, and other threads only pass it work using
+    ``add_callback_threadsafe()``.  All callbacks are queued and invoked
+    from :meth:`process`, i.e. in the thread running the publisher.
+    """
+
+    def __init__(self, parameters, exchange, exchange_type='topic'):
+        self.parameters = parameters
+        self.exchange = exchange
+        self.exchange_type = exchange_type
+        self.connection = None
+        self.channel = None
+        self.callbacks = queue.Queue()
+
+    def open(self, on_open, on_close, on_confirm):
+        import pika
+
+        def call(callback, *args):
+            self.callbacks.put((callback, args))
+
+        def on_connection_open(connection):
+            connection.channel(on_open_callback=on_channel_open)
+
+        def on_channel_open(channel):
+            def on_exchange_declared(frame):
+                channel.confirm_delivery(on_delivery_confirmation,
+                                         callback=on_confirm_selected)
+
+            def on_confirm_selected(frame):
+                self.channel = channel
+                call(on_open)
+
+            channel.add_on_close_callback(on_channel_closed)
+            channel.exchange_declare(exchange=self.exchange,
+                                     exchange_type=self.exchange_type,
+                                     callback=on_exchange_declared)
+
+        def on_channel_closed(channel, reason):
+            if self.channel is channel:
+                self.channel = None
+            _close(connection)
+
+        def on_delivery_confirmation(frame):
+            method = frame.method
+            ack = isinstance(method, pika.spec.Basic.Ack)
+            call(on_confirm, method.delivery_tag, method.multiple, ack)
+
+        def on_connection_closed(connection, reason):
+            call(on_close, reason)
+            connection.ioloop.stop()
+
+        connection = pika.SelectConnection(
+            self.parameters,
+            on_open_callback=on_connection_open,
+            on_open_error_callback=on_connection_closed,
+            on_close_callback=on_connection_closed
+        )
+        self.connection = connection
+        self.channel = None
+        threading.Thread(target=connection.ioloop.start,
+                         name='skyhopper-amqp', daemon=True).start()
+
+    def publish(self, routing_key, body, properties=None):
+        connection = self.connection
+        if connection is None:
+            raise ConnectionError('Not connected')
+
+        def publish():
+            channel = self.channel
+            if connection is not self.connection or channel is None:
+                return  # unconfirmed events are requeued on closing
+            try:
+                channel.basic_publish(exchange=self.exchange,
+                                      routing_key=routing_key, body=body,
+                                      properties=properties)
+            except Exception as e:
+                logger.warning('Error publishing %s event: %r',
+                               routing_key, e)
+                _close(connection)
+        connection.ioloop.add_callback_threadsafe(publish)
+
+    def process(self, timeout):
+        try:
+            callback, args = self.callbacks.get(timeout=timeout)
+            while True:
+                callback(*args)
+                callback, args = self.callbacks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def close(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            connection.ioloop.add_callback_threadsafe(
+                lambda: _close(connection)
+            )
+
+
+def _close(connection):
+    if not connection.is_closing and not connection.is_closed:
+        connection.close()
+
+
+class ReliablePublisher(threading.Thread):
+    """
+    Thread publishing the events from an :class:`EventQueue` with
+    publisher confirms, reconnecting automatically.
+
+    Up to `max_inflight` events are published before waiting for
+    confirmation, so the broker may confirm them in batches.  Events
+    stay in the queue while the broker is unreachable, and events that
+    were not confirmed when the connection was lost or that were
+    rejected by the broker are put back at its front, so no timer
+    event is lost.  Reconnect attempts are delayed with exponential
+    backoff between `min_backoff` and `max_backoff` seconds.
+
+    `transport` must provide the methods of :class:`PikaTransport`.
+    """
+
+    def __init__(self, transport, queue, properties=None, max_inflight=100,
+                 min_backoff=0.5, max_backoff=30.0, poll_interval=0.02):
+        super().__init__(name='skyhopper-publisher', daemon=True)
+        self.transport = transport
+        self.queue = queue
+        self.properties = properties
+        self.max_inflight = max_inflight
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.connected = False
+        self.connecting = False
+        self.backoff = min_backoff
+        self.next_attempt = 0
+        self.inflight = collections.OrderedDict()
+        self.next_tag = 1
+        self.connects = 0
+        self.disconnects = 0
+        self.confirmed = 0
+        self.nacked = 0
+        self.requeued = 0
+        self.lag = None
+        self.max_lag = None
+        self.generation = 0
+        self.__stopped = False
+
+    def run(self):
+        while not self.__stopped:
+            if not self.connected and not self.connecting:
+                delay = self.next_attempt - time.monotonic()
+                if delay > 0:
+                    time.sleep(min(delay, self.poll_interval * 10))
+                    continue
+                self.connect()
+            self.transport.process(self.poll_interval)
+            if self.connected:
+                self.publish_pending()
+        self.transport.close()
+
+    def stop(self):
+        """Stop publishing and close the connection."""
+        self.__stopped = True
+
+    def connect(self):
+        logger.info('Connecting to AMQP broker')
+        self.connecting = True
+        generation = self.generation
+
+        def current(callback):
+            # ignore callbacks of connections that were closed since
+            def wrapper(*args):
+                if generation == self.generation:
+                    callback(*args)
+            return wrapper
+
+        try:
+            self.transport.open(current(self.on_open), current(self.on_close),
+                                current(self.on_confirm))
+        except Exception as e:
+            self.on_close(e)
+
+    def disconnect(self, reason):
+        """Close the connection after an error, and reconnect later."""
+        self.on_close(reason)
+        try:
+            self.transport.close()
+        except Exception:
+            logger.exception('Error closing AMQP connection')
+
+    def publish_pending(self):
+        while len(self.inflight) < self.max_inflight:
+            event = self.queue.get(timeout=0)
+            if event is None:
+                break
+            routing_key, body, _, _ = event
+            try:
+                self.transport.publish(routing_key, body, self.properties)
+            except Exception as e:
+                self.queue.requeue([event])
+                self.disconnect(e)
+                break
+            self.inflight[self.next_tag] = event
+            self.next_tag += 1
+
+    def on_open(self):
+        logger.info('Connected to AMQP broker')
+        self.connected = True
+        self.connecting = False
+        self.connects += 1
+        self.backoff = self.min_backoff
+        self.next_tag = 1
+
+    def on_close(self, reason):
+        self.generation += 1
+        if self.connected:
+            self.disconnects += 1
+        self.connected = False
+        self.connecting = False
+        if self.inflight:
+            self.requeued += len(self.inflight)
+            self.queue.requeue(list(self.inflight.values()))
+            self.inflight.clear()
+        logger.warning('AMQP connection lost (%r), retrying in %.1fs',
+                       reason, self.backoff)
+        self.next_attempt = time.monotonic() + self.backoff
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def on_confirm(self, delivery_tag, multiple, ack):
+        if multiple:
+            tags = [tag for tag in self.inflight if tag <= delivery_tag]
+        else:
+            tags = [delivery_tag] if delivery_tag in self.inflight else []
+        events = [self.inflight.pop(tag) for tag in tags]
+        if ack:
+            self.confirmed += len(events)
+            now = time.time()
+            for _, _, timestamp, _ in events:
+                self.lag = now - timestamp
+                if self.max_lag is None or self.lag > self.max_lag:
+                    self.max_lag = self.lag
+        else:
+            self.nacked += len(events)
+            self.queue.requeue(events)
+
+    def stats(self):
+        """Return queue and publishing statistics as a dictionary."""
+        stats = self.queue.stats()
+        stats.update(connected=self.connected, connects=self.connects,
+                     disconnects=self.disconnects,
+                     inflight=len(self.inflight), confirmed=self.confirmed,
+                     nacked=self.nacked, requeued=self.requeued,
+                     lag=self.lag, max_lag=self.max_lag)
+        return stats
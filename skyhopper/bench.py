@@ -0,0 +1,34 @@
+"""Skyhopper event publishing benchmarks.
+
+Run ``python -m carreralib.bench -m skyhopper.bench`` to include these
+with the protocol benchmarks.
+"""
+
+from carreralib import ControlUnit
+
+from .main import Skyhopper
+from .serializers import SERIALIZERS
+
+
+def benchmarks(status, timer):
+    """Generate `(name, func, items)` tuples for constructing and
+    serializing events from the status and timer frames given."""
+    skyhopper = Skyhopper(None, None)
+    statuses = [ControlUnit.decode(buf) for buf in status]
+    timers = [ControlUnit.decode(buf) for buf in timer]
+    yield 'Skyhopper.construct_status', skyhopper.construct_status, statuses
+    yield ('Skyhopper.status_to_json', skyhopper.status_to_json,
+           [skyhopper.construct_status(s) for s in statuses])
+    yield 'Skyhopper.construct_timer', skyhopper.construct_timer, timers
+    yield ('Skyhopper.timer_to_json', skyhopper.timer_to_json,
+           [skyhopper.construct_timer(t) for t in timers])
+
+    for name, cls in sorted(SERIALIZERS.items()):
+        try:
+            serializer = cls()
+        except ImportError:
+            continue
+        yield ('%s.status' % cls.__name__, serializer.status,
+               [skyhopper.construct_status(s, 1) for s in statuses])
+        yield ('%s.timer' % cls.__name__, serializer.timer,
+               [skyhopper.construct_timer(t, 1) for t in timers])
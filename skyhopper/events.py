@@ -0,0 +1,92 @@
+import typing
+
+
+class Driver(typing.NamedTuple):
+    """
+    This is a :class:`collections.namedtuple` subclass with the
+    following read-only attributes:
+
+    +-----------------+-------+-------------------------------------------+
+    | Attribute       | Index | Value                                     |
+    +=================+=======+===========================================+
+    | :attr:`fuel`    | 0     | Fuel level (0..15)                        |
+    +-----------------+-------+-------------------------------------------+
+    | :attr:`pit`     | 1     | Whether the car is in the pit lane        |
+    +-----------------+-------+-------------------------------------------+
+    | :attr:`id`      | 2     | Driver number (1-indexed)                 |
+    +-----------------+-------+-------------------------------------------+
+    """
+    fuel: int
+    pit: bool
+    id: int
+
+
+class Status(typing.NamedTuple):
+    """Response type returned if no timer events are pending.
+
+    This is a :class:`collections.namedtuple` subclass with the
+    following read-only attributes:
+
+    +---------------------+-------+---------------------------------------+
+    | Attribute           | Index | Value                                 |
+    +=====================+=======+=======================================+
+    | :attr:`timestamp`   | 0     | Time the status was received          |
+    |                     |       | (seconds since the epoch)             |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`start_light` | 1     | Start light indicator (0..9)          |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`mode`        | 2     | 4-bit mode bit mask                   |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`display`     | 3     | Number of drivers to display (6 or 8) |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`drivers`     | 4     | List of all :class:`skyhopper.Driver` |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`sequence`    | 5     | Sequence number of status messages    |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`keyframe`    | 6     | Published for resync, not due to a    |
+    |                     |       | change                                |
+    +---------------------+-------+---------------------------------------+
+    | :attr:`track`       | 7     | Track id, if several tracks are       |
+    |                     |       | supervised                            |
+    +---------------------+-------+---------------------------------------+
+    """
+    timestamp: int
+    start_light: int
+    mode: int
+    display: int
+    drivers: Driver
+    sequence: int = None
+    keyframe: bool = False
+    track: str = None
+
+
+class Timer(typing.NamedTuple):
+    """
+    This is a :class:`collections.namedtuple` subclass with the
+    following read-only attributes:
+
+    +-------------------------+-------+-----------------------------------+
+    | Attribute               | Index | Value                             |
+    +=========================+=======+===================================+
+    | :attr:`timestamp_epoch` | 0     | Time the message was constructed  |
+    |                         |       | (seconds since the epoch)         |
+    +-------------------------+-------+-----------------------------------+
+    | :attr:`timer_value`     | 1     | Timer this event represents (lap  |
+    |                         |       | time)                             |
+    +-------------------------+-------+-----------------------------------+
+    | :attr:`driver`          | 2     | Driver number (1-indexed)         |
+    +-------------------------+-------+-----------------------------------+
+    | :attr:`sector`          | 3     | Sector                            |
+    +-------------------------+-------+-----------------------------------+
+    | :attr:`sequence`        | 4     | Sequence number of timer messages |
+    +-------------------------+-------+-----------------------------------+
+    | :attr:`track`           | 5     | Track id, if several tracks are   |
+    |                         |       | supervised                        |
+    +-------------------------+-------+-----------------------------------+
+    """
+    timestamp_epoch: int
+    timer_value: int
+    driver: int
+    sector: int
+    sequence: int = None
+    track: str = None
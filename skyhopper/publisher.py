@@ -0,0 +1,110 @@
+import collections
+import threading
+import time
+
+DROP_OLDEST = 'drop-oldest'
+"""Drop the oldest droppable event when the queue is full."""
+
+DROP_NEWEST = 'drop-newest'
+"""Drop the event being added if it is droppable and the queue is full."""
+
+BLOCK = 'block'
+"""Block until there is room in the queue."""
+
+
+class EventQueue(object):
+    """
+    Bounded, thread-safe queue of events waiting to be published.
+
+    Each event is a `(routing_key, body, timestamp, droppable)`
+    tuple.  When the queue is full, `policy` decides what happens: only
+    events added with `droppable` set, i.e. status events, are ever
+    dropped, while other events, i.e. timer events, are always added,
+    even if this exceeds `maxsize`.  With the :data:`BLOCK` policy,
+    :meth:`put` waits for room in the queue instead.
+    """
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError('Unknown overflow policy %r' % policy)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.__events = collections.deque()
+        self.__cond = threading.Condition()
+        self.__closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.overflow = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.__events)
+
+    def close(self):
+        """Wake up all waiting threads; :meth:`get` returns `None` once
+        the queue is empty."""
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+    def put(self, routing_key, body, droppable=False):
+        """Add an event, returning `False` if it had to be dropped."""
+        with self.__cond:
+            events = self.__events
+            if self.policy == BLOCK:
+                while len(events) >= self.maxsize and not self.__closed:
+                    self.__cond.wait()
+            elif len(events) >= self.maxsize:
+                if self.policy == DROP_OLDEST and self.__drop_oldest():
+                    pass
+                elif droppable:
+                    self.dropped += 1
+                    return False
+                else:
+                    self.overflow += 1
+            events.append((routing_key, body, time.time(), droppable))
+            self.enqueued += 1
+            if len(events) > self.max_depth:
+                self.max_depth = len(events)
+            self.__cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Remove and return the oldest event, or `None` on timeout or if
+        the queue has been closed."""
+        with self.__cond:
+            if not self.__events and not self.__closed:
+                self.__cond.wait(timeout)
+            if not self.__events:
+                return None
+            event = self.__events.popleft()
+            self.__cond.notify_all()
+            return event
+
+    def requeue(self, events):
+        """Put events returned by :meth:`get` back at the front of the
+        queue in their original order, regardless of `maxsize`."""
+        with self.__cond:
+            self.__events.extendleft(reversed(events))
+            if len(self.__events) > self.max_depth:
+                self.max_depth = len(self.__events)
+            self.__cond.notify_all()
+
+    def stats(self):
+        """Return queue statistics as a dictionary."""
+        with self.__cond:
+            return {
+                'depth': len(self.__events),
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'overflow': self.overflow
+            }
+
+    def __drop_oldest(self):
+        for index, event in enumerate(self.__events):
+            if event[3]:
+                del self.__events[index]
+                self.dropped += 1
+                return True
+        return False
@@ -0,0 +1,152 @@
+import json
+import struct
+
+from .events import Driver, Status, Timer
+
+
+class JSONSerializer(object):
+    """
+    Serializes events as JSON objects, using the field names of
+    :class:`skyhopper.Status` and :class:`skyhopper.Timer`.
+    """
+
+    content_type = 'application/json'
+
+    def status(self, data):
+        d = data._asdict()
+        d['drivers'] = [driver._asdict() for driver in data.drivers]
+        return json.dumps(d)
+
+    def timer(self, data):
+        return json.dumps(data._asdict())
+
+    def loads(self, body):
+        d = json.loads(body)
+        if 'drivers' in d:
+            d['drivers'] = [Driver(**driver) for driver in d['drivers']]
+            return Status(**d)
+        else:
+            return Timer(**d)
+
+
+class BinarySerializer(object):
+    """
+    Serializes events as little-endian binary records.
+
+    Status records start with 22 bytes::
+
+        b'S', sequence (uint32), timestamp (uint32), start_light (uint8),
+        mode (uint8), display (uint8), keyframe (uint8),
+        fuel (8 x uint8), pit bit mask (uint8)
+
+    Timer records start with 15 bytes::
+
+        b'T', sequence (uint32), timestamp_epoch (uint32),
+        timer_value (uint32), driver (uint8), sector (uint8)
+
+    Both are followed by the track id as a UTF-8 string of up to 255
+    bytes, preceded by its length (uint8).  A sequence number of `None`
+    is encoded as zero, and a track id of `None` as an empty string.
+    """
+
+    content_type = 'application/vnd.skyhopper.v1+binary'
+
+    STATUS = struct.Struct('<cIIBBBB8BB')
+
+    TIMER = struct.Struct('<cIIIBB')
+
+    TRACK = struct.Struct('<B')
+
+    def status(self, data):
+        fuel = [driver.fuel for driver in data.drivers]
+        pitmask = 0
+        for n, driver in enumerate(data.drivers):
+            if driver.pit:
+                pitmask |= 1 << n
+        return self.STATUS.pack(
+            b'S', data.sequence or 0, data.timestamp, data.start_light,
+            data.mode, data.display, data.keyframe, *fuel, pitmask
+        ) + self.pack_track(data.track)
+
+    def timer(self, data):
+        return self.TIMER.pack(
+            b'T', data.sequence or 0, data.timestamp_epoch, data.timer_value,
+            data.driver, data.sector
+        ) + self.pack_track(data.track)
+
+    def loads(self, body):
+        if body[:1] == b'S':
+            values = self.STATUS.unpack_from(body)
+            sequence, timestamp, start_light, mode, display = values[1:6]
+            keyframe, fuel, pitmask = values[6], values[7:15], values[15]
+            drivers = [Driver(fuel=f, pit=pitmask & (1 << n) != 0, id=n + 1)
+                       for n, f in enumerate(fuel)]
+            return Status(timestamp=timestamp, start_light=start_light,
+                          mode=mode, display=display, drivers=drivers,
+                          sequence=sequence, keyframe=bool(keyframe),
+                          track=self.unpack_track(body, self.STATUS.size))
+        elif body[:1] == b'T':
+            values = self.TIMER.unpack_from(body)
+            sequence, timestamp_epoch, timer_value, driver, sector = values[1:]
+            return Timer(timestamp_epoch=timestamp_epoch,
+                         timer_value=timer_value, driver=driver,
+                         sector=sector, sequence=sequence,
+                         track=self.unpack_track(body, self.TIMER.size))
+        else:
+            raise ValueError('Unknown record type %r' % body[:1])
+
+    def pack_track(self, track):
+        track = (track or '').encode('utf-8')
+        if len(track) > 255:
+            raise ValueError('Track id too long')
+        return self.TRACK.pack(len(track)) + track
+
+    def unpack_track(self, body, offset):
+        n, = self.TRACK.unpack_from(body, offset)
+        start = offset + self.TRACK.size
+        if len(body) != start + n:
+            raise ValueError('Invalid record length %d' % len(body))
+        return body[start:start + n].decode('utf-8') or None
+
+
+class MsgpackSerializer(object):
+    """
+    Serializes events as MessagePack arrays in field order; requires the
+    `msgpack` package.
+    """
+
+    content_type = 'application/msgpack'
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    def status(self, data):
+        drivers = [tuple(d) for d in data.drivers]
+        return self.msgpack.packb(data[:4] + (drivers,) + data[5:])
+
+    def timer(self, data):
+        return self.msgpack.packb(tuple(data))
+
+    def loads(self, body):
+        values = self.msgpack.unpackb(body)
+        if len(values) == len(Status._fields):
+            values[4] = [Driver(*d) for d in values[4]]
+            return Status(*values)
+        else:
+            return Timer(*values)
+
+
+SERIALIZERS = {
+    'json': JSONSerializer,
+    'binary': BinarySerializer,
+    'msgpack': MsgpackSerializer
+}
+
+
+def get_serializer(name):
+    """Return a new serializer instance for the given format name."""
+    try:
+        return SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError('Unknown serializer %r' % name)
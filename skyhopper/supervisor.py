@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import logging
+import os
+
+from carreralib import ControlUnit, protocol
+from carreralib.aio import AsyncControlUnit
+from carreralib.poll import PollScheduler
+
+import pika
+
+from .amqp import PikaTransport, ReliablePublisher
+from .main import DEFAULT_AMQP_URL, EXCHANGE_NAME, Skyhopper
+from .publisher import EventQueue
+from .serializers import get_serializer
+
+logger = logging.getLogger(__name__)
+
+
+class TrackRunner(object):
+    """
+    Polls a single track's CU on the event loop and publishes its events
+    through a :class:`Skyhopper` instance tagged with the track id.
+
+    Events are published with the same routing keys as a single-track
+    :class:`Skyhopper`, and carry the track id in their `track` field.
+    Pass `track_routing_keys=True` to append ``.<track>`` to the
+    routing keys instead, so consumers may bind to a single track.
+
+    Any error only affects this track: the CU is closed and reopened
+    after a delay growing exponentially from `min_backoff` to
+    `max_backoff` seconds.
+    """
+
+    def __init__(self, track, device, queue, connect=None, min_backoff=0.5,
+                 max_backoff=30.0, **kwargs):
+        self.track = track
+        self.device = device
+        self.skyhopper = Skyhopper(None, None, queue, track=track, **kwargs)
+        self.connect = connect or (
+            lambda device: AsyncControlUnit(device, timeout=1.0)
+        )
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.scheduler = PollScheduler()
+        self.connected = False
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+
+    async def run(self):
+        backoff = self.min_backoff
+        while True:
+            try:
+                cu = self.connect(self.device)
+            except Exception as e:
+                self.fail(e)
+            else:
+                try:
+                    version = await cu.version()
+                    logger.info('Track %s CU version %s', self.track, version)
+                    self.connected = True
+                    backoff = self.min_backoff
+                    await self.poll(cu)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.fail(e)
+                finally:
+                    self.connected = False
+                    try:
+                        await cu.close()
+                    except Exception:
+                        logger.exception('Error closing track %s',
+                                         self.track)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def poll(self, cu):
+        scheduler = self.scheduler
+        skyhopper = self.skyhopper
+        last = None
+        while True:
+            await asyncio.sleep(scheduler.delay())
+            try:
+                data = scheduler.update(await cu.request())
+            except protocol.ChecksumError as e:
+                self.errors += 1
+                logger.warning('Track %s: %r', self.track, e)
+                continue
+            self.polls += 1
+            # prevent counting duplicate laps; in delta mode, unchanged
+            # status is still passed on for sending keyframes
+            status = isinstance(data, ControlUnit.Status)
+            if data == last and not (skyhopper.delta and status):
+                continue
+            elif status:
+                skyhopper.handle_status(data)
+            elif isinstance(data, ControlUnit.Timer):
+                skyhopper.handle_timer(data)
+            last = data
+
+    def fail(self, error):
+        self.errors += 1
+        self.last_error = error
+        logger.warning('Track %s failed: %r', self.track, error)
+
+    def stats(self):
+        stats = self.scheduler.stats()
+        error = repr(self.last_error) if self.last_error else None
+        stats.update(connected=self.connected, polls=self.polls,
+                     errors=self.errors, last_error=error)
+        return stats
+
+
+class Supervisor(object):
+    """
+    Runs a :class:`TrackRunner` for each track in a single event loop.
+
+    `tracks` maps track ids to CU device names; additional keyword
+    arguments are passed to each :class:`TrackRunner`.
+    """
+
+    def __init__(self, tracks, queue, **kwargs):
+        self.runners = [TrackRunner(track, device, queue, **kwargs)
+                        for track, device in tracks.items()]
+
+    async def run(self):
+        await asyncio.gather(*(runner.run() for runner in self.runners))
+
+    def stats(self):
+        return {runner.track: runner.stats() for runner in self.runners}
+
+
+def parse_track(arg):
+    track, sep, device = arg.partition('=')
+    if not sep or not track or not device:
+        raise argparse.ArgumentTypeError('expected TRACK=DEVICE, got %r' % arg)
+    return track, device
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m skyhopper.supervisor')
+    parser.add_argument('tracks', metavar='TRACK=DEVICE', nargs='+',
+                        type=parse_track,
+                        help='track id and CU device, e.g. 1=/dev/ttyUSB0')
+    parser.add_argument('-k', '--track-routing-keys', action='store_true',
+                        help='append the track id to routing keys')
+    parser.add_argument('-s', '--serializer',
+                        default=os.environ.get('SKYHOPPER_SERIALIZER', 'json'))
+    parser.add_argument('-u', '--url',
+                        default=os.environ.get('SKYHOPPER_AMQP_URL',
+                                               DEFAULT_AMQP_URL))
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    tracks = dict(args.tracks)
+    if len(tracks) != len(args.tracks):
+        parser.error('duplicate track id')
+
+    serializer = get_serializer(args.serializer)
+    properties = pika.BasicProperties(content_type=serializer.content_type)
+    transport = PikaTransport(pika.URLParameters(args.url), EXCHANGE_NAME,
+                              exchange_type='topic')
+
+    # a single queue and publisher thread is shared by all tracks
+    queue = EventQueue(maxsize=1000 * len(tracks))
+    publisher = ReliablePublisher(transport, queue, properties)
+    publisher.start()
+
+    supervisor = Supervisor(tracks, queue, delta=True, keyframe_interval=10.0,
+                            serializer=serializer,
+                            track_routing_keys=args.track_routing_keys)
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import unittest
+
+from carreralib import ControlUnit, connection, protocol
+from carreralib.aio import AsyncControlUnit, AsyncSerialConnection
+
+
+class ScriptedConnection(connection.Connection):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def recv(self, maxlength=None):
+        if not self.responses:
+            raise connection.TimeoutError('No more responses')
+        res = self.responses.pop(0)
+        if res is None:
+            raise connection.TimeoutError('Response lost')
+        return res
+
+    def send(self, buf, offset=0, size=None):
+        self.sent.append(bytes(buf))
+
+
+class AsyncControlUnitTest(unittest.TestCase):
+
+    def run_cu(self, responses, coro, **kwargs):
+        conn = ScriptedConnection(responses)
+
+        async def run():
+            cu = AsyncControlUnit(conn, **kwargs)
+            try:
+                return await coro(cu)
+            finally:
+                await cu.close()
+        return conn, asyncio.run(run())
+
+    def test_request(self):
+        conn, res = self.run_cu(
+            [b'?2003037?>1=', b'?:;?????00165084'],
+            lambda cu: asyncio.gather(cu.request(), cu.request())
+        )
+        self.assertEqual(conn.sent, [b'?', b'?'])
+        self.assertEqual(res[0], ControlUnit.Timer(1, 226287, 1))
+        self.assertIsInstance(res[1], ControlUnit.Status)
+        self.assertEqual(res[1].pitmask, 5)
+
+    def test_request_retry(self):
+        conn, res = self.run_cu([b'J', b'05331<'], lambda cu: cu.version())
+        self.assertEqual(conn.sent, [b'0', b'0'])
+        self.assertEqual(res, b'5331')
+
+    def test_request_garbage(self):
+        conn, res = self.run_cu([b'?:;??', b'?2003037?>1='],
+                                lambda cu: cu.request())
+        self.assertEqual(conn.sent, [b'?', b'?'])
+        self.assertEqual(res, ControlUnit.Timer(1, 226287, 1))
+
+    def test_late_response(self):
+        async def requests(cu):
+            with self.assertRaises(connection.TimeoutError):
+                await cu.request()
+            status = await cu.request()
+            return status, await cu.setword(6, 0, 9), await cu.request()
+
+        conn, res = self.run_cu(
+            [None, b'?2003037?>1=', b'?:;?????00165084', b'J'], requests
+        )
+        self.assertEqual(conn.sent, [b'?', b'?', b'J60910'])
+        self.assertIsInstance(res[0], ControlUnit.Status)
+        self.assertEqual(res[1:], (b'J', ControlUnit.Timer(1, 226287, 1)))
+
+    def test_stats(self):
+        calls = []
+
+        async def requests(cu):
+            await cu.request()
+            await cu.version()
+            with self.assertRaises(protocol.ChecksumError):
+                await cu.request()
+            return cu.stats(reset=True), cu.stats()
+
+        conn, (stats, empty) = self.run_cu(
+            [b'?2003037?>1=', b'J', b'05331<', b'?2003037?>1>'], requests,
+            hook=lambda *args: calls.append(args)
+        )
+        self.assertEqual(stats['sends'], 4)
+        self.assertEqual(stats['retransmits'], 1)
+        self.assertEqual(stats['unexpected'], 1)
+        self.assertEqual(stats['checksum_errors'], 1)
+        self.assertEqual(stats['latency']['?']['count'], 2)
+        self.assertEqual([(cmd, n) for cmd, _, n in calls],
+                         [(b'?', 0), (b'0', 1), (b'?', 0)])
+        self.assertEqual(empty['sends'], 0)
+
+    def test_setwords(self):
+        conn, res = self.run_cu([b'J', b'J'],
+                                lambda cu: cu.setwords([(6, 0, 9), (6, 1, 9)]))
+        self.assertEqual(conn.sent, [b'J60910', b'J62912'])
+        self.assertEqual(res, [b'J', b'J'])
+
+    def test_pipeline_order(self):
+        bufs = [b'J60910', b'J60911', b'J60912', b'J60913']
+        conn, res = self.run_cu([None] + [b'J'] * 6,
+                                lambda cu: cu.pipeline(bufs, window=2))
+        self.assertEqual(conn.sent, bufs[:2] + bufs)
+        self.assertEqual(res, [b'J'] * 4)
+
+    def test_setword(self):
+        conn, res = self.run_cu([b'J'], lambda cu: cu.setword(6, 0, 9))
+        self.assertEqual(conn.sent, [b'J60910'])
+        self.assertEqual(res, b'J')
+
+
+class AsyncSerialConnectionTest(unittest.TestCase):
+
+    def test_recv_send(self):
+        master, slave = os.openpty()
+
+        async def run():
+            conn = AsyncSerialConnection(os.ttyname(slave), timeout=1.0)
+            try:
+                os.write(master, b'J$?:;?')
+                self.assertEqual(await conn.recv(), b'J')
+                os.write(master, b'????00165084$')
+                self.assertEqual(await conn.recv(), b'?:;?????00165084')
+                await conn.sendmany([b'?', b'=10'])
+                await conn.send(b'xJ60910x', 1, 6)
+                await asyncio.sleep(0.1)
+                self.assertEqual(os.read(master, 100), b'"?$"=10$"J60910$')
+            finally:
+                await conn.close()
+        try:
+            asyncio.run(run())
+        finally:
+            os.close(master)
+            os.close(slave)
+
+    def test_timeout(self):
+        master, slave = os.openpty()
+
+        async def run():
+            conn = AsyncSerialConnection(os.ttyname(slave), timeout=0.05)
+            try:
+                with self.assertRaises(connection.TimeoutError):
+                    await conn.recv()
+            finally:
+                await conn.close()
+        try:
+            asyncio.run(run())
+        finally:
+            os.close(master)
+            os.close(slave)
@@ -0,0 +1,198 @@
+import threading
+import time
+import unittest
+
+from skyhopper.amqp import PikaTransport, ReliablePublisher
+from skyhopper.publisher import EventQueue
+
+
+class LocalBroker(object):
+    """In-process broker stand-in implementing the transport interface."""
+
+    def __init__(self, available=True, ack=True):
+        self.available = available
+        self.ack = ack
+        self.batch = 1
+        self.received = []
+        self.attempts = 0
+        self.lock = threading.Lock()
+        self.callbacks = None
+        self.pending = []
+        self.tag = 0
+        self.opening = False
+        self.fail = 0
+        self.closed = 0
+        self.closing = []
+
+    def open(self, on_open, on_close, on_confirm):
+        with self.lock:
+            self.attempts += 1
+            if not self.available:
+                raise ConnectionError('broker unavailable')
+            self.callbacks = (on_open, on_close, on_confirm)
+            self.tag = 0
+            self.opening = True
+
+    def publish(self, routing_key, body, properties=None):
+        with self.lock:
+            if self.callbacks is None:
+                raise ConnectionError('not connected')
+            if self.fail:
+                # channel error, connection is still open
+                self.fail -= 1
+                raise ConnectionError('channel closed')
+            self.tag += 1
+            self.pending.append((self.tag, routing_key, body))
+
+    def process(self, timeout):
+        time.sleep(timeout)
+        with self.lock:
+            # connections closed by the client report this later
+            while self.closing:
+                self.closing.pop(0)('closed by client')
+            if self.callbacks is None:
+                return
+            on_open, on_close, on_confirm = self.callbacks
+            if self.opening:
+                self.opening = False
+                on_open()
+            elif not self.available:
+                self.callbacks = None
+                self.pending = []
+                on_close('connection reset')
+            elif len(self.pending) >= self.batch:
+                # confirm all pending messages at once
+                tag = self.pending[-1][0]
+                if self.ack:
+                    self.received.extend(body for _, _, body in self.pending)
+                self.pending = []
+                on_confirm(tag, True, self.ack)
+
+    def close(self):
+        with self.lock:
+            if self.callbacks is not None:
+                self.closing.append(self.callbacks[1])
+                self.closed += 1
+            self.callbacks = None
+            self.pending = []
+
+
+class ReliablePublisherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = EventQueue(maxsize=100)
+
+    def start(self, broker, **kwargs):
+        publisher = ReliablePublisher(broker, self.queue, min_backoff=0.01,
+                                      max_backoff=0.05, poll_interval=0.001,
+                                      **kwargs)
+        publisher.start()
+        self.addCleanup(publisher.join, 1.0)
+        self.addCleanup(publisher.stop)
+        return publisher
+
+    def wait(self, predicate, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail('timed out')
+            time.sleep(0.005)
+
+    def test_publish(self):
+        broker = LocalBroker()
+        broker.batch = 5
+        publisher = self.start(broker)
+        for n in range(10):
+            self.queue.put('timer', n)
+        self.wait(lambda: len(broker.received) == 10)
+        self.assertEqual(broker.received, list(range(10)))
+        stats = publisher.stats()
+        self.assertEqual(stats['confirmed'], 10)
+        self.assertEqual(stats['inflight'], 0)
+        self.assertTrue(stats['connected'])
+
+    def test_spill(self):
+        broker = LocalBroker(available=False)
+        publisher = self.start(broker)
+        for n in range(5):
+            self.queue.put('timer', n)
+        self.wait(lambda: broker.attempts >= 2)
+        self.assertEqual(len(self.queue), 5)
+        broker.available = True
+        self.wait(lambda: len(broker.received) == 5)
+        self.assertEqual(broker.received, list(range(5)))
+        self.assertEqual(publisher.stats()['connects'], 1)
+
+    def test_reconnect(self):
+        broker = LocalBroker()
+        broker.batch = 1000  # never confirm
+        publisher = self.start(broker, max_inflight=3)
+        for n in range(5):
+            self.queue.put('timer', n)
+        self.wait(lambda: publisher.stats()['inflight'] == 3)
+        broker.available = False
+        self.wait(lambda: publisher.stats()['disconnects'] == 1)
+        self.assertEqual(publisher.stats()['requeued'], 3)
+        events = [self.queue.get()[1] for _ in range(5)]
+        self.assertEqual(events, list(range(5)))
+
+    def test_publish_error(self):
+        broker = LocalBroker()
+        broker.fail = 1
+        publisher = self.start(broker)
+        for n in range(5):
+            self.queue.put('timer', n)
+        self.wait(lambda: len(broker.received) == 5)
+        self.assertEqual(broker.received, list(range(5)))
+        self.assertEqual(broker.closed, 1)
+        stats = publisher.stats()
+        self.assertEqual(stats['connects'], 2)
+        self.assertEqual(stats['disconnects'], 1)
+        self.assertTrue(stats['connected'])
+
+    def test_nack(self):
+        broker = LocalBroker(ack=False)
+        publisher = self.start(broker, max_inflight=2)
+        self.queue.put('timer', 1)
+        self.wait(lambda: publisher.stats()['nacked'] >= 1)
+        broker.ack = True
+        self.wait(lambda: broker.received == [1])
+
+    def test_backoff(self):
+        broker = LocalBroker(available=False)
+        publisher = ReliablePublisher(broker, self.queue, min_backoff=1.0,
+                                      max_backoff=4.0)
+        for _ in range(4):
+            publisher.connect()
+        self.assertEqual(publisher.backoff, 4.0)
+        self.assertGreater(publisher.next_attempt, time.monotonic())
+
+
+class PikaTransportTest(unittest.TestCase):
+
+    def test_refused(self):
+        import pika
+        parameters = pika.URLParameters(
+            'amqp://127.0.0.1:1/%2F?connection_attempts=1&socket_timeout=1'
+        )
+        transport = PikaTransport(parameters, 'skyhopper')
+        closed = []
+        transport.open(lambda: None, closed.append, lambda *args: None)
+        deadline = time.monotonic() + 5.0
+        while not closed and time.monotonic() < deadline:
+            transport.process(0.05)
+        transport.close()
+        self.assertEqual(len(closed), 1)
+        self.assertRaises(ConnectionError, transport.publish, 'timer', b'')
+
+
+class RequeueTest(unittest.TestCase):
+
+    def test_requeue(self):
+        queue = EventQueue(maxsize=1)
+        queue.put('timer', 3)
+        queue.requeue([
+            ('timer', 1, 0.0, False), ('timer', 2, 0.0, False)
+        ])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.get()[1] for _ in range(3)], [1, 2, 3])
@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from carreralib import ControlUnit, bench
+
+STATUS = ControlUnit.Status((15,) * 8, 0, 6, (False,) * 8, 8).encode()
+
+TIMER = ControlUnit.Timer(1, 226287, 1).encode()
+
+
+class BenchTest(unittest.TestCase):
+
+    def run_benchmarks(self, benchmarks):
+        names = []
+        for name, func, items in benchmarks([STATUS], [TIMER]):
+            self.assertTrue(items)
+            for item in items:
+                func(item)
+            names.append(name)
+        return names
+
+    def test_benchmarks(self):
+        names = self.run_benchmarks(bench.benchmarks)
+        self.assertIn('ControlUnit.request', names)
+        self.assertNotIn('Skyhopper.timer_to_json', names)
+
+    def test_module(self):
+        from skyhopper import bench as skyhopper_bench
+        names = self.run_benchmarks(skyhopper_bench.benchmarks)
+        self.assertIn('Skyhopper.timer_to_json', names)
+        self.assertIn('BinarySerializer.status', names)
+
+    def test_allocations(self):
+        try:
+            import tracemalloc  # noqa: F401
+        except ImportError:
+            self.skipTest('tracemalloc not available')
+        self.assertGreaterEqual(bench.allocations(bytearray, [4096]), 4096)
+        self.assertLess(bench.allocations(len, [STATUS, TIMER]), 64)
+
+    def test_autorange(self):
+        calls = []
+
+        class Timer(object):
+            def timeit(self, number):
+                calls.append(number)
+                return number * 0.01
+
+        self.assertEqual(bench.autorange(Timer()), 20)
+        self.assertEqual(calls, [1, 2, 5, 10, 20])
+
+    def test_compare(self):
+        baseline = {'results': [
+            {'name': 'a', 'ns_per_op': 100.0},
+            {'name': 'b', 'ns_per_op': 100.0},
+        ]}
+        results = {'results': [
+            {'name': 'a', 'ns_per_op': 105.0},
+            {'name': 'b', 'ns_per_op': 150.0},
+            {'name': 'c', 'ns_per_op': 500.0},
+        ]}
+        self.assertEqual(list(bench.compare(results, baseline, 0.1)),
+                         [('b', 1.5)])
+
+    def test_compare_allocations(self):
+        baseline = {'results': [
+            {'name': 'a', 'ns_per_op': 100.0, 'bytes_per_op': 100.0},
+            {'name': 'b', 'ns_per_op': 100.0, 'bytes_per_op': None},
+            {'name': 'c', 'ns_per_op': 100.0},
+        ]}
+        results = {'results': [
+            {'name': 'a', 'ns_per_op': 100.0, 'bytes_per_op': 200.0},
+            {'name': 'b', 'ns_per_op': 100.0, 'bytes_per_op': 200.0},
+            {'name': 'c', 'ns_per_op': 100.0, 'bytes_per_op': 200.0},
+        ]}
+        self.assertEqual(
+            list(bench.compare(results, baseline, 0.1, 'bytes_per_op')),
+            [('a', 2.0)]
+        )
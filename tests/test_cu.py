@@ -0,0 +1,216 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from carreralib import ControlUnit, connection, protocol
+
+
+class ScriptedConnection(connection.Connection):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def recv(self, maxlength=None):
+        if not self.responses:
+            raise connection.TimeoutError('No more responses')
+        return self.responses.pop(0)
+
+    def send(self, buf, offset=0, size=None):
+        self.sent.append(bytes(buf))
+
+
+class TimeoutConnection(ScriptedConnection):
+
+    def recv(self, maxlength=None):
+        res = ScriptedConnection.recv(self, maxlength)
+        if res is None:
+            raise connection.TimeoutError('Response lost')
+        return res
+
+
+class ControlUnitTest(unittest.TestCase):
+
+    def test_status_decode(self):
+        fuel = (11, 15, 15, 15, 15, 15, 0, 0)
+        for buf in (
+            protocol.pack('cc8YYYBYC', b'?', b':', *fuel + (1, 6, 5, 8)),
+            protocol.pack('cc8YYYBYxxC', b'?', b':', *fuel + (1, 6, 5, 8)),
+        ):
+            status = ControlUnit.Status.decode(buf)
+            self.assertEqual(status.fuel, fuel)
+            self.assertEqual(status.start, 1)
+            self.assertEqual(status.mode, 6)
+            self.assertEqual(status.pit, (True, False, True) + (False,) * 5)
+            self.assertEqual(status.pitmask, 5)
+            self.assertEqual(status.display, 8)
+        with self.assertRaises(protocol.ChecksumError):
+            ControlUnit.Status.decode(buf[:-1] + b'?')
+        with self.assertRaises(protocol.ProtocolError):
+            ControlUnit.Status.decode(buf[:-1])
+
+    def test_status_pitmask(self):
+        status = ControlUnit.Status((0,) * 8, 0, 0, [False, True] * 4, 8)
+        self.assertEqual(status.pitmask, 0xaa)
+
+    def test_timer_decode(self):
+        for buf, res in (
+            (b'?2003037?>1=', (1, 226287, 1)),
+            (b'?20030:9211<', (1, 236050, 1)),
+            (b'?200301<?618', (1, 246127, 1)),
+        ):
+            self.assertEqual(ControlUnit.Timer.decode(buf), res)
+
+    def test_stats(self):
+        calls = []
+        conn = ScriptedConnection([
+            b'?2003037?>1=', b'J', b'05331<', b'J', b'?2003037?>1>'
+        ])
+        cu = ControlUnit(conn, hook=lambda *args: calls.append(args))
+        cu.request()
+        self.assertEqual(cu.version(), b'5331')
+        cu.setword(6, 0, 9)
+        self.assertRaises(protocol.ChecksumError, cu.request)
+        self.assertRaises(connection.TimeoutError, cu.request)
+        stats = cu.stats(reset=True)
+        self.assertEqual(stats['sends'], 6)
+        self.assertEqual(stats['retransmits'], 1)
+        self.assertEqual(stats['unexpected'], 1)
+        self.assertEqual(stats['checksum_errors'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(sorted(stats['latency']), ['0', '?', 'J'])
+        self.assertEqual(stats['latency']['?']['count'], 2)
+        buckets = stats['latency']['?']['buckets']
+        self.assertEqual(sum(n for _, n in buckets), 2)
+        self.assertEqual([(cmd, n) for cmd, _, n in calls],
+                         [(b'?', 0), (b'0', 1), (b'J', 0), (b'?', 0)])
+        self.assertEqual(cu.stats()['sends'], 0)
+
+    def test_retry_limit(self):
+        conn = ScriptedConnection([b'J'] * 10)
+        cu = ControlUnit(conn, retries=2, backoff=0)
+        self.assertRaises(connection.TimeoutError, cu.version)
+        self.assertEqual(conn.sent, [b'0'] * 3)
+
+    def test_retry_deadline(self):
+        conn = ScriptedConnection([b'J'] * 10)
+        cu = ControlUnit(conn, retries=10, backoff=0.05, deadline=0.1)
+        self.assertRaises(connection.TimeoutError, cu.version)
+        self.assertEqual(conn.sent, [b'0'] * 3)
+
+    def test_retry_garbage(self):
+        conn = ScriptedConnection([b'?2003037?>1', b'?2003037?>1='])
+        cu = ControlUnit(conn)
+        self.assertEqual(cu.request(), ControlUnit.Timer(1, 226287, 1))
+        self.assertEqual(conn.sent, [b'?', b'?'])
+
+    def test_buffered_timer(self):
+        calls = []
+        conn = ScriptedConnection([
+            b'?2003037?>1=', b'J', b'=', b'?2003037?>1='
+        ])
+        cu = ControlUnit(conn, hook=lambda *args: calls.append(args))
+        self.assertEqual(cu.setword(6, 0, 9), b'J')
+        self.assertEqual(cu.stats()['buffered'], 1)
+        self.assertIsNone(cu.request(b'=10', response_needed=False))
+        self.assertEqual(cu.request(), ControlUnit.Timer(1, 226287, 1))
+        self.assertEqual(conn.sent, [b'J60910', b'J60910', b'=10'])
+        self.assertEqual(cu.stats()['latency']['?']['count'], 1)
+        self.assertEqual([(cmd, n) for cmd, _, n in calls],
+                         [(b'J', 1), (b'=', 0), (b'?', 0)])
+        self.assertEqual(cu.request(), ControlUnit.Timer(1, 226287, 1))
+        self.assertEqual(conn.sent[-1], b'?')
+
+    def test_late_response(self):
+        conn = ScriptedConnection([])
+        cu = ControlUnit(conn)
+        self.assertRaises(connection.TimeoutError, cu.version)
+        conn.responses.extend([b'05331<', b'J'])
+        self.assertEqual(cu.setword(6, 0, 9), b'J')
+        self.assertEqual(conn.sent, [b'0', b'J60910'])
+        self.assertEqual(cu.stats()['retransmits'], 0)
+
+    def test_late_response_same_command(self):
+        conn = ScriptedConnection([])
+        cu = ControlUnit(conn)
+        self.assertRaises(connection.TimeoutError, cu.request)
+        conn.responses.extend([b'?2003037?>1=', b'?:;?????00165084', b'J'])
+        status = cu.request()
+        self.assertIsInstance(status, ControlUnit.Status)
+        self.assertEqual(cu.setword(6, 0, 9), b'J')
+        self.assertEqual(conn.sent, [b'?', b'?', b'J60910'])
+        self.assertEqual(cu.stats()['retransmits'], 0)
+        # the late timer event is not lost
+        self.assertEqual(cu.request(), ControlUnit.Timer(1, 226287, 1))
+
+    def test_lost_response(self):
+        conn = ScriptedConnection([])
+        cu = ControlUnit(conn)
+        self.assertRaises(connection.TimeoutError, cu.request)
+        # the response taken as late was the response to this request
+        conn.responses.append(b'?:;?????00165084')
+        self.assertRaises(connection.TimeoutError, cu.request)
+        conn.responses.append(b'?:;?????00165084')
+        self.assertIsInstance(cu.request(), ControlUnit.Status)
+        conn.responses.append(b'05331<')
+        self.assertEqual(cu.version(), b'5331')
+        self.assertEqual(cu.stats()['retransmits'], 0)
+
+    def test_truncated_version(self):
+        conn = ScriptedConnection([b'0533<', b'05331<'])
+        cu = ControlUnit(conn)
+        self.assertEqual(cu.version(), b'5331')
+        self.assertEqual(conn.sent, [b'0', b'0'])
+
+    def test_setwords(self):
+        conn = ScriptedConnection([b'J', b'?2003037?>1=', b'J', b'J', b'J'])
+        cu = ControlUnit(conn)
+        res = cu.setwords([(0, 1, 10), (1, 1, 10, 2), (2, 1, 10, 2)])
+        self.assertEqual(res, [b'J', b'J', b'J'])
+        self.assertEqual(conn.sent, [
+            b'J02:1=', b'J12:2?', b'J22:20', b'J12:2?'
+        ])
+        self.assertEqual(cu.stats()['retransmits'], 1)
+        self.assertEqual(cu.request(), ControlUnit.Timer(1, 226287, 1))
+
+    def test_pipeline_window(self):
+        class WindowConnection(ScriptedConnection):
+            maxinflight = 0
+
+            def recv(self, maxlength=None):
+                inflight = len(self.sent) - self.received
+                self.maxinflight = max(self.maxinflight, inflight)
+                self.received += 1
+                return b'J'
+
+        conn = WindowConnection([])
+        conn.received = 0
+        cu = ControlUnit(conn)
+        res = cu.setwords([(0, n % 8, 10) for n in range(24)], window=4)
+        self.assertEqual(res, [b'J'] * 24)
+        self.assertEqual(len(conn.sent), 24)
+        self.assertEqual(conn.maxinflight, 4)
+        self.assertRaises(ValueError, cu.setwords, [(0, 0, 0)], window=0)
+
+    def test_pipeline_failure(self):
+        conn = ScriptedConnection([b'0', b'J', b'0', b'J'])
+        cu = ControlUnit(conn, retries=1)
+        res = cu.pipeline([b'J60910', b'J60911'])
+        self.assertEqual(res[1], b'J')
+        self.assertIsInstance(res[0], connection.TimeoutError)
+        self.assertEqual(conn.sent, [b'J60910', b'J60911', b'J60910'])
+
+    def test_pipeline_order(self):
+        calls = []
+        # late responses to the requests that timed out are discarded
+        conn = TimeoutConnection([None] + [b'J'] * 8)
+        cu = ControlUnit(conn, hook=lambda *args: calls.append(args))
+        bufs = [b'J60910', b'J60911', b'J60912', b'J60913', b'J60914']
+        self.assertEqual(cu.pipeline(bufs, window=3), [b'J'] * 5)
+        self.assertEqual(conn.sent, bufs[:3] + bufs)
+        self.assertEqual([(cmd, n) for cmd, _, n in calls],
+                         [(b'J', 1)] * 3 + [(b'J', 0)] * 2)
+        stats = cu.stats()
+        self.assertEqual(stats['retransmits'], 3)
+        self.assertEqual(stats['unexpected'], 3)
+        self.assertEqual(stats['latency']['J']['count'], 5)
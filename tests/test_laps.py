@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+import random
+import statistics
+import unittest
+
+from carreralib import ControlUnit
+from carreralib.laps import LapHistory
+from carreralib.race import RaceState
+
+
+class LapHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(42)
+        self.times = [rand.randrange(4000, 6000) for _ in range(1000)]
+        self.fuel = [15 - n * 16 // 1000 for n in range(1000)]
+        self.history = LapHistory()
+        for laptime, fuel in zip(self.times, self.fuel):
+            self.history.append(laptime, fuel)
+
+    def test_memory(self):
+        history = self.history
+        self.assertEqual(len(history), 1000)
+        self.assertEqual(history.times.itemsize + history.fuel.itemsize, 5)
+        self.assertEqual(list(history), self.times)
+        self.assertEqual(history[-1], self.times[-1])
+
+    def test_stats(self):
+        stats = self.history.stats()
+        self.assertEqual(stats['count'], 1000)
+        self.assertEqual(stats['total'], sum(self.times))
+        self.assertAlmostEqual(stats['mean'], statistics.mean(self.times))
+        self.assertAlmostEqual(stats['stdev'], statistics.stdev(self.times))
+        self.assertAlmostEqual(stats['median'], statistics.median(self.times))
+        self.assertEqual(stats['min'], min(self.times))
+        self.assertEqual(stats['max'], max(self.times))
+        self.assertEqual(stats['best'], self.times.index(min(self.times)))
+        stats = self.history.stats(100, 200)
+        self.assertEqual(stats['count'], 100)
+        self.assertEqual(stats['min'], min(self.times[100:200]))
+        self.assertEqual(LapHistory().stats(), {'count': 0})
+
+    def test_percentile(self):
+        history = LapHistory()
+        for laptime in (4000, 5000, 6000, 7000, 8000):
+            history.append(laptime)
+        self.assertEqual(history.percentile(0), 4000)
+        self.assertEqual(history.percentile(50), 6000)
+        self.assertEqual(history.percentile(90), 7600)
+        self.assertEqual(history.percentile(100), 8000)
+        self.assertRaises(ValueError, history.percentile, 101)
+        self.assertIsNone(LapHistory().percentile(50))
+
+    def test_rolling(self):
+        rolling = self.history.rolling(10)
+        self.assertEqual(len(rolling), 991)
+        for n in (0, 500, 990):
+            mean = statistics.mean(self.times[n:n + 10])
+            self.assertAlmostEqual(rolling[n], mean)
+        self.assertEqual(len(LapHistory().rolling(5)), 0)
+        self.assertRaises(ValueError, self.history.rolling, 0)
+
+    def test_fuel_pace(self):
+        pace = self.history.fuel_pace()
+        self.assertEqual(sorted(pace), sorted(set(self.fuel)))
+        for level in (0, 15):
+            times = [t for t, f in zip(self.times, self.fuel) if f == level]
+            self.assertAlmostEqual(pace[level], statistics.mean(times))
+
+    def test_race(self):
+        race = RaceState()
+        race.update(ControlUnit.Status((12,) * 8, 0, 0, (False,) * 8, 8))
+        for timestamp in (1000, 5000, 9500):
+            race.update(ControlUnit.Timer(0, timestamp, 1))
+        history = race.drivers[0].history
+        self.assertEqual(list(history), [4000, 4500])
+        self.assertEqual(list(history.fuel), [12, 12])
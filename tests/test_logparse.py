@@ -0,0 +1,71 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from carreralib import ControlUnit, logparse
+from carreralib.logparse import REQUEST, RESPONSE, RETRANSMIT, STATUS, TIMER
+from carreralib.record import RECEIVED, RecordReader, Recorder, SENT
+
+LOG = """\
+2020-01-26,14:53:40.581 [DEBUG] Connecting to COM3
+2020-01-26,14:53:40.622 [DEBUG] Sending message b'0'
+2020-01-26,14:53:40.635 [DEBUG] Unknown from track: b'05330;'
+2020-01-26,14:53:40.639 [DEBUG] Sending message b'?'
+2020-01-26,14:53:40.667 [DEBUG] Status from track: \
+Status(fuel=(11, 15, 15, 15, 15, 15, 0, 0), start=1, mode=6, \
+pit=(False, True, False, False, False, False, False, False), display=8)
+2020-01-26,14:53:41.001 [DEBUG] Sending message b'?' again
+2020-01-26,14:53:41.020 [DEBUG] Timer from track: \
+Timer(address=1, timestamp=243019, sector=1)
+2020-01-26,14:53:41.030 [DEBUG] Timer from track: garbage
+"""
+
+
+class LogParseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = LOG.splitlines(True)
+
+    def test_parse(self):
+        entries = list(logparse.parse(self.lines))
+        self.assertEqual([e.kind for e in entries], [
+            REQUEST, RESPONSE, REQUEST, STATUS, RETRANSMIT, TIMER
+        ])
+        self.assertEqual(entries[0].value, b'0')
+        self.assertEqual(entries[1].value, b'05330;')
+        self.assertEqual(entries[3].value, ControlUnit.Status(
+            (11, 15, 15, 15, 15, 15, 0, 0), 1, 6,
+            (False, True) + (False,) * 6, 8
+        ))
+        self.assertEqual(entries[4].value, b'?')
+        self.assertEqual(entries[5].value, ControlUnit.Timer(1, 243019, 1))
+        # 2020-01-26 14:53:40 UTC
+        self.assertAlmostEqual(entries[0].timestamp, 1580050420.622)
+        self.assertAlmostEqual(entries[5].timestamp, 1580050421.020)
+
+    def test_events(self):
+        events = list(logparse.events(self.lines))
+        self.assertEqual(len(events), 2)
+        self.assertIsInstance(events[0][1], ControlUnit.Status)
+        self.assertIsInstance(events[1][1], ControlUnit.Timer)
+
+    def test_convert(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        logfile = os.path.join(tmpdir, 'race.log')
+        with open(logfile, 'w') as f:
+            f.write(LOG)
+        path = os.path.join(tmpdir, 'race.rec')
+        with Recorder(path) as recorder:
+            self.assertEqual(logparse.convert(logfile, recorder), 6)
+        with RecordReader(path) as reader:
+            records = [(r.kind, bytes(r.frame)) for r in reader]
+        self.assertEqual([kind for kind, _ in records], [
+            SENT, RECEIVED, SENT, RECEIVED, SENT, RECEIVED
+        ])
+        self.assertEqual(ControlUnit.decode(records[3][1]).start, 1)
+        timer = ControlUnit.Timer(1, 243019, 1)
+        self.assertEqual(records[5][1], timer.encode())
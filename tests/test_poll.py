@@ -0,0 +1,84 @@
+import unittest
+
+from carreralib import ControlUnit
+from carreralib.poll import PollScheduler
+
+
+def status(start):
+    return ControlUnit.Status((15,) * 8, start, 0, (False,) * 8, 8)
+
+
+TIMER = ControlUnit.Timer(0, 1000, 1)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeCU(object):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def request(self):
+        return self.responses.pop(0)
+
+
+class PollSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(start=100.0, race=50.0, idle=5.0,
+                                       clock=self.clock,
+                                       sleep=self.clock.sleep)
+
+    def test_states(self):
+        scheduler = self.scheduler
+        self.assertEqual(scheduler.delay(), 0.0)
+        for data, state, rate in [
+            (status(1), PollScheduler.IDLE, 5.0),
+            (status(3), PollScheduler.START, 100.0),
+            (status(0), PollScheduler.RACE, 50.0),
+            (TIMER, PollScheduler.TIMER, None),
+            (status(9), PollScheduler.IDLE, 5.0)
+        ]:
+            scheduler.update(data)
+            self.assertEqual(scheduler.state, state)
+            self.assertEqual(scheduler.target_rate, rate)
+
+    def test_delay(self):
+        scheduler = self.scheduler
+        scheduler.update(status(0))
+        self.assertAlmostEqual(scheduler.delay(), 0.02)
+        self.clock.now += 0.015
+        self.assertAlmostEqual(scheduler.delay(), 0.005)
+        self.clock.now += 0.1
+        self.assertEqual(scheduler.delay(), 0.0)
+        scheduler.update(TIMER)
+        self.assertEqual(scheduler.delay(), 0.0)
+
+    def test_poll(self):
+        scheduler = self.scheduler
+        cu = FakeCU([status(0)] * 10 + [TIMER] * 5 + [status(1)] * 3)
+        for _ in range(10):
+            scheduler.poll(cu)
+        self.assertAlmostEqual(self.clock.now, 0.18)
+        self.assertAlmostEqual(scheduler.rate, 50.0)
+        for _ in range(5):
+            scheduler.poll(cu)
+        self.assertAlmostEqual(self.clock.now, 0.2)
+        for _ in range(3):
+            scheduler.poll(cu)
+        self.assertAlmostEqual(self.clock.now, 0.6)
+        stats = scheduler.stats()
+        self.assertEqual(stats['state'], PollScheduler.IDLE)
+        self.assertEqual(stats['target_rate'], 5.0)
+        self.assertLess(stats['rate'], 50.0)
@@ -0,0 +1,87 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from carreralib import ControlUnit, connection, protocol
+from carreralib.poll import PollScheduler
+
+STATUS = protocol.pack('cc8YYYBYC', b'?', b':', *(15,) * 8 + (0, 0, 0, 8))
+
+TIMERS = [b'?2003037?>1=', b'?2003037?>1=', b'?20030:9211<']
+
+
+class FakeConnection(connection.Connection):
+    """Answers polls with the given frames, then with status only."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.sent = []
+        self.lock = threading.Lock()
+        self.response = None
+
+    def recv(self, maxlength=None):
+        with self.lock:
+            return self.response
+
+    def send(self, buf, offset=0, size=None):
+        with self.lock:
+            buf = bytes(buf)
+            self.sent.append(buf)
+            if buf != b'?':
+                self.response = buf[:1]
+            elif self.frames:
+                self.response = self.frames.pop(0)
+            else:
+                self.response = STATUS
+
+
+class PollerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConnection(TIMERS)
+        self.cu = ControlUnit(self.conn)
+        self.addCleanup(self.cu.close)
+        self.scheduler = PollScheduler(start=1000, race=1000, idle=1000)
+
+    def test_events(self):
+        events = self.cu.events(scheduler=self.scheduler)
+        timers = []
+        for event in events:
+            if isinstance(event, ControlUnit.Status):
+                break
+            timers.append(event)
+        self.assertEqual(timers, [(1, 226287, 1), (1, 236050, 1)])
+        self.assertIs(self.cu.poller(), events.poller)
+
+    def test_subscribe(self):
+        done = threading.Event()
+        received = []
+
+        def callback(event):
+            received.append(event)
+            if isinstance(event, ControlUnit.Status):
+                done.set()
+        self.cu.subscribe(callback, scheduler=self.scheduler)
+        self.assertTrue(done.wait(1.0))
+        self.cu.poller().unsubscribe(callback)
+        self.assertEqual(len(received), 3)
+        # commands may be interleaved with polling
+        self.cu.setword(1, 2, 3)
+        self.assertIn(b'J', [buf[:1] for buf in self.conn.sent])
+
+    def test_buffering(self):
+        events = self.cu.events(maxsize=2, scheduler=self.scheduler)
+        while events.dropped == 0:
+            threading.Event().wait(0.01)
+        self.assertLessEqual(len(events), 2)
+        self.cu.close()
+        self.assertEqual(len(list(events)), 2)
+
+    def test_close(self):
+        events = self.cu.events(scheduler=self.scheduler)
+        poller = events.poller
+        events.close()
+        self.assertIsNone(events.get(timeout=0))
+        poller.stop()
+        self.assertFalse(poller.is_alive())
@@ -2,7 +2,9 @@ from __future__ import unicode_literals
 
 import unittest
 
-from carreralib.protocol import chksum, pack, unpack
+from carreralib.protocol import (
+    ProtocolError, Struct, chksum, compile, pack, unpack, unpack_from
+)
 
 
 class ProtocolTest(unittest.TestCase):
@@ -22,6 +24,9 @@ class ProtocolTest(unittest.TestCase):
             ([b'6091'], 0),
         ):
             self.assertEqual(chksum(*args), res)
+            buf = args[0]
+            self.assertEqual(chksum(bytearray(buf), *args[1:]), res)
+            self.assertEqual(chksum(memoryview(buf), *args[1:]), res)
 
     def test_pack(self):
         for fmt, args, res in (
@@ -41,3 +46,44 @@ class ProtocolTest(unittest.TestCase):
             ('x8YC', b':01234500?', (0, 1, 2, 3, 4, 5, 0, 0)),
         ):
             self.assertEqual(unpack(fmt, buf), res)
+
+    def test_unpack_length(self):
+        for fmt, buf in (
+            ('c4sC', b''),
+            ('c4sC', b'0532;'),
+            ('c4sC', b'05321;$'),
+            ('cYIYC', b'?2003037?>1'),
+        ):
+            with self.assertRaises(ProtocolError):
+                unpack(fmt, buf)
+
+    def test_struct(self):
+        for fmt, args, buf, size in (
+            ('cBYYC', [b'J', 6, 9, 1], b'J60910', 6),
+            ('cYIYC', [b'?', 2, 226287, 1], b'?2003037?>1=', 12),
+            ('c4sC', [b'0', b'5321'], b'05321;', 6),
+        ):
+            s = Struct(fmt)
+            self.assertEqual(s.format, fmt)
+            self.assertEqual(s.size, size)
+            self.assertEqual(s.pack(*args), buf)
+            self.assertEqual(s.unpack(buf), tuple(args))
+
+    def test_compile(self):
+        self.assertIs(compile('cBYYC'), compile('cBYYC'))
+        with self.assertRaises(ValueError):
+            compile('cQ')
+
+    def test_unpack_from(self):
+        for fmt, buf, offset, res in (
+            ('c4sC', b'05321;', 0, (b'0', b'5321')),
+            ('c4sC', b'$05321;$', 1, (b'0', b'5321')),
+            ('cYIYC', b'$$?2003037?>1=$', 2, (b'?', 2, 226287, 1)),
+            ('x8YC', b'$:01234500?', 1, (0, 1, 2, 3, 4, 5, 0, 0)),
+        ):
+            for data in (buf, bytearray(buf), memoryview(buf)):
+                self.assertEqual(unpack_from(fmt, data, offset), res)
+        with self.assertRaises(ProtocolError):
+            unpack_from('c4sC', b'$05321', 1)
+        with self.assertRaises(ProtocolError):
+            unpack_from('c4sC', b'05321;', 7)
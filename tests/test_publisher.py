@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+from skyhopper.publisher import BLOCK, DROP_NEWEST, DROP_OLDEST, EventQueue
+
+
+class EventQueueTest(unittest.TestCase):
+
+    def drain(self, queue):
+        events = []
+        while len(queue):
+            events.append(queue.get()[:2])
+        return events
+
+    def test_drop_oldest(self):
+        queue = EventQueue(maxsize=2, policy=DROP_OLDEST)
+        self.assertTrue(queue.put('status', 1, droppable=True))
+        self.assertTrue(queue.put('timer', 2))
+        self.assertTrue(queue.put('status', 3, droppable=True))
+        self.assertTrue(queue.put('timer', 4))
+        self.assertFalse(queue.put('status', 5, droppable=True))
+        self.assertTrue(queue.put('timer', 6))
+        self.assertEqual(self.drain(queue),
+                         [('timer', 2), ('timer', 4), ('timer', 6)])
+        stats = queue.stats()
+        self.assertEqual(stats['dropped'], 3)
+        self.assertEqual(stats['overflow'], 1)
+        self.assertEqual(stats['max_depth'], 3)
+
+    def test_drop_newest(self):
+        queue = EventQueue(maxsize=1, policy=DROP_NEWEST)
+        self.assertTrue(queue.put('status', 1, droppable=True))
+        self.assertFalse(queue.put('status', 2, droppable=True))
+        self.assertTrue(queue.put('timer', 3))
+        self.assertEqual(self.drain(queue), [('status', 1), ('timer', 3)])
+
+    def test_block(self):
+        queue = EventQueue(maxsize=1, policy=BLOCK)
+        queue.put('status', 1, droppable=True)
+        thread = threading.Thread(target=queue.put, args=('timer', 2))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(queue.get()[:2], ('status', 1))
+        thread.join(1.0)
+        self.assertEqual(queue.get()[:2], ('timer', 2))
+
+    def test_requeue(self):
+        queue = EventQueue(maxsize=2, policy=DROP_OLDEST)
+        queue.put('status', 1, droppable=True)
+        queue.put('timer', 2)
+        events = [queue.get(), queue.get()]
+        queue.requeue(events)
+        self.assertEqual(queue.get(), events[0])
+        queue.requeue(events[:1])
+        queue.put('timer', 3)
+        # requeued status event is still droppable
+        self.assertEqual(self.drain(queue), [('timer', 2), ('timer', 3)])
+        self.assertEqual(queue.stats()['dropped'], 1)
+
+    def test_policy(self):
+        self.assertRaises(ValueError, EventQueue, policy='foo')
@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+from carreralib import ControlUnit
+from carreralib.race import RaceState
+
+Timer = ControlUnit.Timer
+
+
+def status(fuel=(15,) * 8, pit=(False,) * 8):
+    return ControlUnit.Status(tuple(fuel), 0, 0, tuple(pit), 8)
+
+
+class RaceStateTest(unittest.TestCase):
+
+    def nums(self, race):
+        return [driver.num for driver in race.standings]
+
+    def test_laps(self):
+        race = RaceState()
+        race.update(Timer(0, 1000, 1))
+        race.update(Timer(1, 1100, 1))
+        self.assertEqual(self.nums(race), [1, 2])
+        self.assertEqual(race.gap(race.drivers[1]), (0, 100))
+        race.update(Timer(1, 5000, 1))
+        self.assertEqual(self.nums(race), [2, 1])
+        self.assertEqual(race.gap(race.drivers[0]), (1, None))
+        race.update(Timer(0, 5200, 1))
+        self.assertEqual(self.nums(race), [2, 1])
+        self.assertEqual(race.gap(race.drivers[0]), (0, 200))
+        driver = race.drivers[1]
+        self.assertEqual((driver.position, driver.laps), (1, 1))
+        self.assertEqual((driver.laptime, driver.bestlap), (3900, 3900))
+        self.assertEqual(race.leader, driver)
+        self.assertEqual((race.start, race.maxlaps), (1000, 1))
+        self.assertIsNone(race.gap(race.drivers[2]))
+
+    def test_duplicates(self):
+        race = RaceState()
+        race.update(Timer(0, 1000, 1))
+        self.assertEqual(race.update(Timer(0, 2000, 1)), [race.drivers[0]])
+        self.assertEqual(race.update(Timer(0, 2000, 1)), [])
+        self.assertEqual(race.drivers[0].laps, 1)
+
+    def test_status(self):
+        race = RaceState()
+        changes = []
+        race.subscribe(lambda event, changed: changes.append(changed))
+        race.update(status())
+        race.update(status(pit=(True,) + (False,) * 7))
+        race.update(status(pit=(True,) + (False,) * 7))
+        race.update(status(fuel=(10,) + (15,) * 7))
+        self.assertEqual(race.drivers[0].pits, 1)
+        self.assertEqual(race.drivers[0].fuel, 10)
+        self.assertEqual(len(changes), 3)
+        self.assertEqual(changes[1], [race.drivers[0]])
+
+    def test_order(self):
+        rand = random.Random(42)
+        race = RaceState()
+        times = [0] * 8
+        for _ in range(500):
+            address = rand.randrange(8)
+            times[address] = max(times) + rand.randrange(1, 1000)
+            race.update(Timer(address, times[address], 1))
+            drivers = [d for d in race.drivers if d.time is not None]
+            expected = sorted(drivers, key=lambda d: (-d.laps, d.time))
+            self.assertEqual(race.standings, expected)
+            for pos, driver in enumerate(race.standings, start=1):
+                self.assertEqual(driver.position, pos)
+
+    def test_reset(self):
+        race = RaceState()
+        race.update(Timer(0, 1000, 1))
+        race.reset()
+        self.assertEqual(race.standings, [])
+        self.assertIsNone(race.leader)
+        self.assertIsNone(race.start)
@@ -0,0 +1,139 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from carreralib import ControlUnit, connection, protocol
+from carreralib.record import INDEX, RECEIVED, SENT
+from carreralib.record import RecordReader, Recorder, RecordingConnection
+from carreralib.record import _LapCounter
+
+STATUS = protocol.pack('cc8YYYBYC', b'?', b':', *(15,) * 8 + (0, 0, 0, 8))
+
+
+def timer(address, timestamp, sector=1):
+    return ControlUnit.Timer(address, timestamp, sector).encode()
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.01
+        return self.now
+
+
+class EchoConnection(connection.Connection):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def recv(self, maxlength=None):
+        return self.responses.pop(0)
+
+    def send(self, buf, offset=0, size=None):
+        pass
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'race.rec')
+
+    def record(self, laps=20, polls=50, close=True, **kwargs):
+        recorder = Recorder(self.path, clock=FakeClock(), **kwargs)
+        frames = []
+        for lap in range(laps):
+            for n in range(polls):
+                frames.append(STATUS)
+            for address in (1, 0):
+                frames.append(timer(address, lap * 5000 + address * 100))
+        for frame in frames:
+            recorder.write(b'?', SENT)
+            recorder.write(frame)
+        if close:
+            recorder.close()
+        else:
+            recorder.flush()
+        return frames
+
+    def test_roundtrip(self):
+        frames = self.record()
+        with RecordReader(self.path) as reader:
+            records = [(r.time, r.kind, bytes(r.frame)) for r in reader]
+        self.assertEqual(len(records), 2 * len(frames))
+        self.assertEqual([r[2] for r in records if r[1] == RECEIVED], frames)
+        self.assertEqual({r[2] for r in records if r[1] == SENT}, {b'?'})
+        self.assertNotIn(INDEX, [r[1] for r in records])
+        times = [r[0] for r in records]
+        self.assertEqual(times, sorted(times))
+
+    def test_seek(self):
+        self.record(interval=64, blocksize=4)
+        with RecordReader(self.path) as reader:
+            self.assertGreater(len(reader.index), 20)
+            for lap in (1, 7, 19):
+                record = next(reader.seek_lap(lap))
+                frame = timer(1, lap * 5000 + 100)
+                self.assertEqual(bytes(record.frame), frame)
+                del record
+            self.assertEqual(list(reader.seek_lap(20)), [])
+            records = list(reader)
+            start = records[500].time
+            record = next(reader.seek_time(start - 0.001))
+            self.assertEqual(record.time, start)
+            del records, record
+
+    def test_unclosed(self):
+        self.record(interval=64, blocksize=4)
+        with RecordReader(self.path) as reader:
+            closed = [entry for entry in reader.index]
+        self.record(interval=64, blocksize=4, close=False)
+        with RecordReader(self.path) as reader:
+            lap = next(reader.seek_lap(7))
+            self.assertEqual(bytes(lap.frame), timer(1, 35100))
+            del lap
+            index = reader.index
+        # lap transitions are indexed the same, periodic entries may be lost
+        self.assertEqual(self.transitions(index), self.transitions(closed))
+
+    def transitions(self, index):
+        laps = {}
+        for _, lap, offset in index:
+            laps.setdefault(lap, offset)
+        return laps
+
+    def test_connection(self):
+        responses = [b'05331<', timer(0, 1000)]
+        conn = RecordingConnection(EchoConnection(responses),
+                                   Recorder(self.path))
+        cu = ControlUnit(conn)
+        self.assertEqual(cu.version(), b'5331')
+        self.assertIsInstance(cu.request(), ControlUnit.Timer)
+        cu.close()
+        with RecordReader(self.path) as reader:
+            records = [(r.kind, bytes(r.frame)) for r in reader]
+        self.assertEqual(records, [
+            (SENT, b'0'), (RECEIVED, b'05331<'),
+            (SENT, b'?'), (RECEIVED, timer(0, 1000))
+        ])
+
+    def test_sectors(self):
+        laps = _LapCounter()
+        self.assertFalse(laps.update(timer(0, 1000)))
+        self.assertFalse(laps.update(timer(0, 3000, sector=2)))
+        self.assertFalse(laps.update(timer(0, 4000, sector=3)))
+        self.assertEqual(sum(laps.crossings), 1)
+        self.assertTrue(laps.update(timer(0, 6000)))
+        self.assertEqual(laps.maxlaps, 1)
+
+    def test_invalid(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a recording at all')
+        self.assertRaises(ValueError, RecordReader, self.path)
@@ -0,0 +1,72 @@
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from carreralib import ControlUnit, connection
+
+LOG = """\
+2020-01-26,14:53:40.581 [DEBUG] Connecting to COM3
+2020-01-26,14:53:40.622 [DEBUG] Sending message b'0'
+2020-01-26,14:53:40.635 [DEBUG] Unknown from track: b'05330;'
+2020-01-26,14:53:40.639 [DEBUG] Sending message b'?'
+2020-01-26,14:53:40.667 [DEBUG] Status from track: Status(\
+fuel=(11, 15, 15, 15, 15, 15, 0, 0), start=1, mode=6, \
+pit=(False, False, True, False, False, False, False, False), display=8)
+2020-01-26,14:53:40.683 [DEBUG] Sending message b'J60910'
+2020-01-26,14:53:40.699 [DEBUG] Unknown from track: b'J'
+2020-01-26,14:53:40.701 [DEBUG] Sending message b'?'
+2020-01-26,14:53:40.705 [WARNING] Received unexpected message b'J'
+2020-01-26,14:53:40.705 [INFO] Sending message b'?' again
+2020-01-26,14:53:40.901 [DEBUG] Timer from track: \
+Timer(address=0, timestamp=7845, sector=1)
+"""
+
+
+class ReplayConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'race.log')
+        with io.open(self.path, 'w') as f:
+            f.write(LOG)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replay(self):
+        cu = ControlUnit('replay:' + self.path)
+        self.assertEqual(cu.version(), b'5330')
+        status = cu.request()
+        self.assertEqual(status.fuel, (11, 15, 15, 15, 15, 15, 0, 0))
+        self.assertEqual(status.pitmask, 4)
+        # setpos is not recorded here, so it is simply echoed
+        self.assertEqual(cu.setword(6, 1, 2), b'J')
+        self.assertEqual(cu.request(), ControlUnit.Timer(0, 7845, 1))
+        self.assertRaises(EOFError, cu.request)
+        cu.close()
+
+    def test_replay_loop(self):
+        conn = connection.open('replay:' + self.path + '?loop=1')
+        cu = ControlUnit(conn)
+        for _ in range(3):
+            self.assertIsInstance(cu.request(), ControlUnit.Status)
+            self.assertIsInstance(cu.request(), ControlUnit.Timer)
+        cu.close()
+
+    def test_replay_speed(self):
+        cu = ControlUnit('replay:' + self.path + '?speed=2')
+        start = time.time()
+        cu.request()
+        cu.request()
+        # recorded responses are 234 ms apart
+        self.assertGreater(time.time() - start, 0.1)
+        cu.close()
+
+    def test_replay_options(self):
+        self.assertRaises(ValueError, connection.open,
+                          'replay:' + self.path + '?foo=1')
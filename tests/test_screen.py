@@ -0,0 +1,101 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from carreralib.screen import Screen, startlights
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeWindow(object):
+
+    def __init__(self, nlines=10, ncols=40):
+        self.size = (nlines, ncols)
+        self.calls = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name,) + args)
+
+
+class ScreenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.window = FakeWindow()
+        self.screen = Screen(self.window, fps=4, lightattr=1,
+                             clock=self.clock)
+
+    def frame(self, lines, lights=0):
+        screen = self.screen
+        self.window.calls = []
+        nlines, ncols = screen.begin()
+        for row, text in enumerate(lines):
+            screen.draw(row, text, ncols)
+        screen.erase(len(lines), nlines - 1)
+        screen.draw(nlines - 1, 'footer', ncols, lights=lights)
+        return screen.end()
+
+    def drawn(self):
+        return [(call[1], call[3]) for call in self.window.calls
+                if call[0] == 'addnstr']
+
+    def test_changed_lines(self):
+        self.assertTrue(self.frame(['a', 'b', 'c']))
+        self.assertEqual(self.window.calls[0], ('clear',))
+        self.assertEqual(self.drawn(), [
+            (0, 'a'), (1, 'b'), (2, 'c'), (9, 'footer')
+        ])
+        self.clock.now += 0.25
+        self.assertTrue(self.frame(['a', 'c']))
+        self.assertEqual(self.drawn(), [(1, 'c')])
+        self.assertEqual(self.window.calls[-2:], [
+            ('clrtoeol',), ('refresh',)
+        ])
+        self.clock.now += 0.25
+        self.assertFalse(self.frame(['a', 'c']))
+        self.assertEqual(self.window.calls, [])
+
+    def test_fps(self):
+        self.assertTrue(self.frame(['a']))
+        self.clock.now += 0.125
+        self.assertEqual(self.screen.delay(), 0.125)
+        self.assertIsNone(self.screen.begin())
+        self.clock.now += 0.125
+        self.assertEqual(self.screen.delay(), 0)
+        self.assertIsNotNone(self.screen.begin())
+
+    def test_resize(self):
+        self.frame(['a'])
+        self.clock.now += 0.25
+        self.window.size = (20, 80)
+        self.frame(['a'])
+        self.assertEqual(self.window.calls[0], ('clear',))
+        self.assertEqual(self.drawn(), [(0, 'a'), (19, 'footer')])
+
+    def test_lights(self):
+        self.frame([], lights=2)
+        self.assertIn(('chgat', 9, 0, 4, 1), self.window.calls)
+        self.clock.now += 0.25
+        self.assertFalse(self.frame([], lights=2))
+        self.clock.now += 0.25
+        self.assertTrue(self.frame([], lights=0))
+        self.assertEqual(self.drawn(), [(9, 'footer')])
+
+    def test_startlights(self):
+        self.assertEqual(startlights(0, 0.0), 0)
+        self.assertEqual(startlights(1, 0.0), 5)
+        self.assertEqual(startlights(4, 0.0), 3)
+        self.assertEqual(startlights(7, 0.0), 0)
+        self.assertEqual(startlights(8, 0.0), 5)
+        self.assertEqual(startlights(8, 0.5), 0)
+        self.assertEqual(startlights(9, 1.0), 5)
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from carreralib.connection import BufferTooShort, TimeoutError
+from carreralib.serial import SerialConnection
+
+
+class SerialConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = SerialConnection('loop://', timeout=0.1)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_recv(self):
+        # loop:// echoes each framed message, including the leading '"'
+        self.conn.send(b'?')
+        self.assertEqual(self.conn.recv(), b'"?')
+
+    def test_recv_buffered(self):
+        for buf in (b'J60910', b'=10', b'0'):
+            self.conn.send(buf)
+        self.assertEqual(self.conn.recv(), b'"J60910')
+        self.assertEqual(self.conn.recv(), b'"=10')
+        self.assertEqual(self.conn.recv(), b'"0')
+        with self.assertRaises(TimeoutError):
+            self.conn.recv()
+
+    def test_send_offset(self):
+        self.conn.send(b'xJ60910x', 1, 6)
+        self.assertEqual(self.conn.recv(), b'"J60910')
+        self.assertRaises(ValueError, self.conn.send, b'?', 2)
+        self.assertRaises(ValueError, self.conn.send, b'?', 0, 2)
+
+    def test_sendmany(self):
+        self.conn.sendmany([b'=10', bytearray(b'J60910'), b'J41111'])
+        self.assertEqual(self.conn.recv(), b'"=10')
+        self.assertEqual(self.conn.recv(), b'"J60910')
+        self.assertEqual(self.conn.recv(), b'"J41111')
+
+    def test_recv_maxlength(self):
+        self.conn.send(b'J60910')
+        self.conn.send(b'?')
+        self.assertRaises(BufferTooShort, self.conn.recv, 6)
+        self.assertEqual(self.conn.recv(2), b'"?')
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from skyhopper import Driver, Status, Timer
+from skyhopper.serializers import BinarySerializer, JSONSerializer
+from skyhopper.serializers import get_serializer
+
+DRIVERS = [Driver(fuel=15 - n, pit=n in (1, 6), id=n + 1) for n in range(8)]
+
+STATUS = Status(timestamp=1587312000, start_light=7, mode=6, display=8,
+                drivers=DRIVERS, sequence=42, keyframe=True)
+
+TIMER = Timer(timestamp_epoch=1587312000, timer_value=226287, driver=2,
+              sector=1, sequence=7)
+
+
+class SerializerTest(unittest.TestCase):
+
+    def test_json(self):
+        serializer = JSONSerializer()
+        self.assertEqual(serializer.content_type, 'application/json')
+        self.assertEqual(json.loads(serializer.status(STATUS))['drivers'][1],
+                         {'fuel': 14, 'pit': True, 'id': 2})
+        self.assertEqual(serializer.loads(serializer.status(STATUS)), STATUS)
+        self.assertEqual(serializer.loads(serializer.timer(TIMER)), TIMER)
+
+    def test_binary(self):
+        serializer = BinarySerializer()
+        status = serializer.status(STATUS)
+        timer = serializer.timer(TIMER)
+        self.assertEqual(len(status), 23)
+        self.assertEqual(len(timer), 16)
+        self.assertEqual(serializer.loads(status), STATUS)
+        self.assertEqual(serializer.loads(timer), TIMER)
+        self.assertRaises(ValueError, serializer.loads, b'X')
+        self.assertRaises(ValueError, serializer.loads, status + b'x')
+
+    def test_binary_track(self):
+        serializer = BinarySerializer()
+        status = STATUS._replace(track='b\xfchl')
+        timer = TIMER._replace(track='a')
+        self.assertEqual(serializer.loads(serializer.status(status)), status)
+        self.assertEqual(serializer.loads(serializer.timer(timer)), timer)
+        self.assertRaises(ValueError, serializer.timer,
+                          TIMER._replace(track='x' * 256))
+
+    def test_msgpack(self):
+        try:
+            serializer = get_serializer('msgpack')
+        except ImportError:
+            self.skipTest('msgpack not installed')
+        self.assertEqual(serializer.loads(serializer.status(STATUS)), STATUS)
+        self.assertEqual(serializer.loads(serializer.timer(TIMER)), TIMER)
+
+    def test_get_serializer(self):
+        self.assertIsInstance(get_serializer('binary'), BinarySerializer)
+        self.assertRaises(ValueError, get_serializer, 'xml')
@@ -0,0 +1,137 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from carreralib import ControlUnit, connection, protocol
+from carreralib.sim import PtyServer, SimulatedConnection, Simulator
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SimulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def simulator(self, **kwargs):
+        return Simulator(seed=42, clock=self.clock, **kwargs)
+
+    def poll(self, cu, seconds, step=0.01):
+        events = []
+        for _ in range(int(seconds / step)):
+            self.clock.now += step
+            events.append(cu.request())
+        return events
+
+    def test_race(self):
+        sim = self.simulator(cars=3, laptime=4000, stdev=100, burn=1,
+                             pitlevel=5)
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        self.assertEqual(cu.version(), b'5331')
+        events = self.poll(cu, 60)
+        timers = [e for e in events if isinstance(e, ControlUnit.Timer)]
+        status = [e for e in events if isinstance(e, ControlUnit.Status)]
+        self.assertEqual({t.address for t in timers}, {0, 1, 2})
+        for address in range(3):
+            times = [t.timestamp for t in timers if t.address == address]
+            self.assertEqual(times, sorted(times))
+            self.assertGreater(len(times), 10)
+        self.assertTrue(any(s.pit[0] for s in status))
+        self.assertEqual(status[-1].fuel[3:], (0,) * 5)
+        self.assertEqual(status[-1].mode, 5)
+
+    def test_start_lights(self):
+        sim = self.simulator()
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        cu.start()
+        self.assertEqual(cu.request().start, 1)
+        self.assertEqual(self.poll(cu, 10)[-1].start, 1)
+        cu.start()
+        lights = [e.start for e in self.poll(cu, 8)
+                  if isinstance(e, ControlUnit.Status)]
+        self.assertEqual(sorted(set(lights)), [0, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(lights[-1], 0)
+
+    def test_settings(self):
+        sim = self.simulator(cars=4)
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        cu.setspeed(1, 10)
+        cu.setbrake(2, 9)
+        cu.setfuel(3, 8)
+        cu.setlap(37)
+        cu.setpos(0, 2)
+        self.assertEqual(sim.cars[1].speed, 10)
+        self.assertEqual(sim.cars[2].brake, 9)
+        self.assertEqual(sim.cars[3].fuelrate, 8)
+        self.assertEqual(sim.display, {(17, 7): 2, (18, 7): 5, (6, 0): 2})
+        cu.ignore(0x0f)
+        events = self.poll(cu, 30)
+        timers = [e for e in events if isinstance(e, ControlUnit.Timer)]
+        self.assertFalse(timers)
+
+    def test_setwords(self):
+        sim = self.simulator(cars=8, wrong=0.1, drop=0.1)
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        commands = [(word, address, 10 - word, 2)
+                    for address in range(8) for word in (0, 1, 2)]
+        self.assertEqual(cu.setwords(commands), [b'J'] * 24)
+        for car in sim.cars:
+            self.assertEqual((car.speed, car.brake, car.fuelrate), (10, 9, 8))
+
+    def test_speed(self):
+        sim = self.simulator(cars=1, laptime=1000, stdev=0, speed=10)
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        cu.reset()
+        events = self.poll(cu, 1)
+        timers = [e for e in events if isinstance(e, ControlUnit.Timer)]
+        self.assertGreaterEqual(len(timers), 9)
+        self.assertEqual(timers[1].timestamp - timers[0].timestamp, 1000)
+
+    def test_faults(self):
+        sim = self.simulator(wrong=0.1, checksum=0.1, drop=0.1)
+        conn = SimulatedConnection(simulator=sim)
+        errors = 0
+        for _ in range(1000):
+            conn.send(b'?')
+            try:
+                ControlUnit.decode(conn.recv())
+            except (protocol.ChecksumError, protocol.ProtocolError):
+                errors += 1
+        for fault in ('wrong', 'checksum', 'drop'):
+            self.assertGreater(sim.counts[fault], 50)
+        self.assertGreater(errors, 100)
+
+    def test_options(self):
+        conn = connection.open('sim:cars=4&speed=10&seed=1')
+        self.assertEqual(len(conn.simulator.cars), 4)
+        self.assertEqual(conn.simulator.speed, 10)
+        self.assertRaises(ValueError, connection.open, 'sim:foo=1')
+        self.assertRaises(ValueError, connection.open, 'sim:cars=9')
+
+    def test_send(self):
+        conn = SimulatedConnection(simulator=self.simulator())
+        conn.send(b'x0', 1, 1)
+        self.assertEqual(conn.recv(), b'05331<')
+        self.assertRaises(ValueError, conn.send, b'0', -1)
+        self.assertRaises(ValueError, conn.send, b'0', 2)
+        self.assertRaises(ValueError, conn.send, b'0', 0, -1)
+        self.assertRaises(ValueError, conn.send, b'0', 1, 1)
+        self.assertEqual(sum(conn.simulator.counts.values()), 1)
+
+    def test_pty(self):
+        with PtyServer(self.simulator(cars=2)) as server:
+            cu = ControlUnit(server.device, timeout=1.0)
+            try:
+                self.assertEqual(cu.version(), b'5331')
+                self.assertIsInstance(cu.request(), ControlUnit.Status)
+                cu.setspeed(1, 10)
+                self.assertEqual(server.simulator.cars[1].speed, 10)
+            finally:
+                cu.close()
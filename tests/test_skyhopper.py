@@ -1,3 +1,4 @@
+import json
 import unittest
 
 from carreralib import ControlUnit
@@ -5,6 +6,7 @@ from skyhopper import Skyhopper
 from skyhopper import Driver
 from skyhopper import Status
 from skyhopper import Timer
+from skyhopper.publisher import EventQueue
 
 class SkyhopperTest(unittest.TestCase):
     
@@ -32,3 +34,35 @@ class SkyhopperTest(unittest.TestCase):
         self.assertTrue(expected_value.timer_value == s.timer_value)
         self.assertTrue(expected_value.driver == s.driver)
         self.assertTrue(expected_value.sector == s.sector)
+
+    def test_queued_publish(self):
+        queue = EventQueue(maxsize=10)
+        skyh = Skyhopper(None, None, queue)
+        skyh.handle_timer(ControlUnit.Timer(address=3, sector=1, timestamp=42))
+        routing_key, body, _, _ = queue.get()
+        self.assertEqual(routing_key, 'track.event.timer')
+        self.assertEqual(json.loads(body)['driver'], 4)
+
+    def test_delta_status(self):
+        queue = EventQueue(maxsize=10)
+        skyh = Skyhopper(None, None, queue, delta=True, keyframe_interval=3600)
+        status = ControlUnit.Status(fuel=(15,) * 8, start=7, mode=6,
+                                    pit=(False,) * 8, display=8)
+        for _ in range(3):
+            skyh.handle_status(status)
+        skyh.handle_status(status._replace(start=0))
+        bodies = [json.loads(queue.get()[1]) for _ in range(len(queue))]
+        self.assertEqual([b['start_light'] for b in bodies], [7, 0])
+        self.assertEqual([b['sequence'] for b in bodies], [1, 2])
+        self.assertEqual([b['keyframe'] for b in bodies], [False, False])
+
+    def test_delta_keyframe(self):
+        queue = EventQueue(maxsize=10)
+        skyh = Skyhopper(None, None, queue, delta=True, keyframe_interval=0)
+        status = ControlUnit.Status(fuel=(15,) * 8, start=7, mode=6,
+                                    pit=(False,) * 8, display=8)
+        skyh.handle_status(status)
+        skyh.handle_status(status)
+        bodies = [json.loads(queue.get()[1]) for _ in range(len(queue))]
+        self.assertEqual([b['keyframe'] for b in bodies], [False, True])
+        self.assertEqual([b['sequence'] for b in bodies], [1, 2])
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import unittest
+
+from carreralib import protocol
+
+from skyhopper.publisher import EventQueue
+from skyhopper.supervisor import Supervisor, parse_track
+
+STATUS = protocol.pack('cc8YYYBYC', b'?', b':', *(15,) * 8 + (0, 0, 0, 8))
+
+VERSION = protocol.pack('c4sC', b'0', b'5331')
+
+
+class FakeCU(object):
+    """Answers CU requests on the master side of a pty."""
+
+    def __init__(self, loop, timers):
+        self.master, self.slave = os.openpty()
+        self.device = os.ttyname(self.slave)
+        self.timers = list(timers)
+        self.loop = loop
+        self.buffer = b''
+        loop.add_reader(self.master, self.read_ready)
+
+    def read_ready(self):
+        self.buffer += os.read(self.master, 1024)
+        while b'$' in self.buffer:
+            request, _, self.buffer = self.buffer.partition(b'$')
+            request = request.lstrip(b'"')
+            if request == b'0':
+                response = VERSION
+            elif request == b'?' and self.timers:
+                response = self.timers.pop(0)
+            elif request == b'?':
+                response = STATUS
+            else:
+                response = request[:1]
+            os.write(self.master, response + b'$')
+
+    def close(self):
+        self.loop.remove_reader(self.master)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class SupervisorTest(unittest.TestCase):
+
+    def test_parse_track(self):
+        self.assertEqual(parse_track('1=/dev/ttyUSB0'), ('1', '/dev/ttyUSB0'))
+        self.assertEqual(parse_track('a=loop://'), ('a', 'loop://'))
+        for arg in ('/dev/ttyUSB0', '=/dev/ttyUSB0', '1='):
+            self.assertRaises(Exception, parse_track, arg)
+
+    def run_supervisor(self, queue, **kwargs):
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            cus = [FakeCU(loop, [b'?2003037?>1=']),
+                   FakeCU(loop, [b'?20030:9211<'])]
+            tracks = {'a': cus[0].device, 'b': cus[1].device,
+                      'c': '/nonexistent'}
+            supervisor = Supervisor(tracks, queue, min_backoff=0.01,
+                                    max_backoff=0.02, delta=True, **kwargs)
+            task = asyncio.ensure_future(supervisor.run())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            for cu in cus:
+                cu.close()
+            return supervisor.stats()
+
+        return asyncio.run(run())
+
+    def events(self, queue):
+        events = {}
+        while len(queue):
+            routing_key, body, _, _ = queue.get()
+            event = json.loads(body)
+            events.setdefault((routing_key, event['track']), []).append(event)
+        return events
+
+    def test_supervisor(self):
+        queue = EventQueue(maxsize=1000)
+        stats = self.run_supervisor(queue)
+        events = self.events(queue)
+        self.assertEqual(sorted(events), [
+            ('track.event.status', 'a'), ('track.event.status', 'b'),
+            ('track.event.timer', 'a'), ('track.event.timer', 'b')
+        ])
+        timers = events[('track.event.timer', 'a')]
+        self.assertEqual(timers[0]['timer_value'], 226287)
+        timers = events[('track.event.timer', 'b')]
+        self.assertEqual(timers[0]['timer_value'], 236050)
+        # delta mode only publishes the first status
+        self.assertEqual(len(events[('track.event.status', 'a')]), 1)
+        self.assertGreater(stats['a']['polls'], 1)
+        self.assertEqual(stats['a']['errors'], 0)
+        self.assertFalse(stats['c']['connected'])
+        self.assertGreater(stats['c']['errors'], 1)
+
+    def test_track_routing_keys(self):
+        queue = EventQueue(maxsize=1000)
+        self.run_supervisor(queue, track_routing_keys=True)
+        self.assertEqual(sorted(self.events(queue)), [
+            ('track.event.status.a', 'a'), ('track.event.status.b', 'b'),
+            ('track.event.timer.a', 'a'), ('track.event.timer.b', 'b')
+        ])
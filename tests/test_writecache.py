@@ -0,0 +1,136 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from carreralib import ControlUnit, connection
+from carreralib.sim import SimulatedConnection, Simulator
+from carreralib.writecache import WriteCache
+
+
+class FakeCU(object):
+
+    def __init__(self, fail=0):
+        self.words = []
+        self.fail = fail
+        self.event = threading.Event()
+        self.event.set()
+        self.entered = threading.Event()
+
+    def setword(self, word, address, value, repeat=1):
+        self.entered.set()
+        self.event.wait()
+        if self.fail:
+            self.fail -= 1
+            raise connection.TimeoutError('Timeout')
+        self.words.append((word, address, value, repeat))
+
+
+class WriteCacheTest(unittest.TestCase):
+
+    def test_skip(self):
+        cu = FakeCU()
+        cache = WriteCache(cu)
+        cache.setspeed(0, 10)
+        cache.setbrake(0, 10)
+        self.assertTrue(cache.flush())
+        cache.setspeed(0, 10)
+        cache.setbrake(0, 10)
+        cache.setfuel(0, 10)
+        self.assertTrue(cache.flush())
+        self.assertEqual(cu.words, [
+            (0, 0, 10, 2), (1, 0, 10, 2), (2, 0, 10, 2)
+        ])
+        self.assertEqual(cache.stats()['skipped'], 2)
+        cache.invalidate()
+        cache.setspeed(0, 10)
+        cache.flush()
+        self.assertEqual(len(cu.words), 4)
+
+    def test_coalesce(self):
+        cu = FakeCU()
+        cache = WriteCache(cu)
+        for lap in range(1, 40):
+            cache.setlap(lap)
+        for pos in range(1, 9):
+            cache.setpos(2, pos)
+        cache.setpos(3, 1)
+        self.assertEqual(len(cache), 4)
+        cache.flush()
+        self.assertEqual(cu.words, [
+            (17, 7, 2, 1), (18, 7, 7, 1), (6, 2, 8, 1), (6, 3, 1, 1)
+        ])
+        cache.setlap(39)
+        cache.setlap(40)
+        cache.setlap(39)
+        self.assertEqual(len(cache), 0)
+
+    def test_clrpos(self):
+        cu = FakeCU()
+        cache = WriteCache(cu)
+        cache.setlap(1)
+        cache.setpos(0, 1)
+        cache.flush()
+        cache.setpos(1, 2)
+        cache.clrpos()
+        cache.setpos(0, 1)
+        cache.setlap(1)
+        cache.flush()
+        self.assertEqual(cu.words[3:], [
+            (6, 0, 9, 1), (6, 0, 1, 1), (17, 7, 0, 1), (18, 7, 1, 1)
+        ])
+
+    def test_clrpos_sending(self):
+        cu = FakeCU()
+        cu.event.clear()
+        with WriteCache(cu) as cache:
+            cache.start()
+            cache.setpos(0, 1)
+            self.assertTrue(cu.entered.wait(1.0))
+            # position being sent is reset by clrpos
+            cache.clrpos()
+            cache.setpos(0, 1)
+            self.assertEqual(len(cache), 2)
+            cu.event.set()
+            self.assertTrue(cache.flush(timeout=1.0))
+            cache.setpos(0, 1)
+            self.assertEqual(len(cache), 0)
+        self.assertEqual(cu.words, [
+            (6, 0, 1, 1), (6, 0, 9, 1), (6, 0, 1, 1)
+        ])
+
+    def test_errors(self):
+        cu = FakeCU(fail=1)
+        cache = WriteCache(cu)
+        cache.setpos(0, 1)
+        cache.setpos(1, 2)
+        self.assertFalse(cache.flush())
+        self.assertEqual(cache.stats()['errors'], 1)
+        self.assertTrue(cache.flush())
+        self.assertEqual(cu.words, [(6, 0, 1, 1), (6, 1, 2, 1)])
+
+    def test_background(self):
+        cu = FakeCU(fail=1)
+        cu.event.clear()
+        with WriteCache(cu, retry=0.01) as cache:
+            cache.start()
+            cache.setlap(1)
+            self.assertFalse(cache.flush(timeout=0.05))
+            # value being sent is not skipped or sent again
+            cache.setlap(2)
+            cache.setlap(1)
+            cu.event.set()
+            self.assertTrue(cache.flush(timeout=1.0))
+        self.assertEqual(cu.words, [(17, 7, 0, 1), (18, 7, 1, 1)])
+        self.assertEqual(cache.stats()['errors'], 1)
+
+    def test_simulator(self):
+        sim = Simulator()
+        cu = ControlUnit(SimulatedConnection(simulator=sim))
+        with WriteCache(cu) as cache:
+            cache.start()
+            cache.setlap(37)
+            cache.setspeed(1, 10)
+            self.assertTrue(cache.flush(timeout=1.0))
+        self.assertEqual(sim.display, {(17, 7): 2, (18, 7): 5})
+        self.assertEqual(sim.cars[1].speed, 10)